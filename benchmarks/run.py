@@ -0,0 +1,142 @@
+"""
+Measures the throughput and the memory usage of ``push``, ``push -a`` and
+``pull`` against a local fake crowdin server, on a synthetic project.
+
+    PYTHONPATH=. python benchmarks/run.py --files 2000 --languages 20
+"""
+import logging
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from optparse import OptionParser
+
+from crowdin.api import API
+from crowdin.client import pull, push
+from crowdin.metrics import Metrics
+from tests.server import FakeCrowdin
+
+
+LANGUAGES = ['fr', 'de', 'it', 'es', 'pt', 'nl', 'sv', 'da', 'fi', 'no',
+             'pl', 'cs', 'sk', 'hu', 'ro', 'bg', 'el', 'tr', 'ru', 'uk',
+             'ja', 'ko', 'zh', 'ar', 'he', 'hi', 'th', 'vi', 'id', 'ms']
+
+
+def serve(queue, latency, languages):
+    server = FakeCrowdin(languages=languages, latency=latency).start()
+    queue.put(server.root_url)
+    while True:
+        time.sleep(60)
+
+
+def generate_project(root, files, languages, dirs=20, size=2048):
+    """
+    Creates ``files`` source .po files spread over ``dirs`` localizations,
+    and their translations, returns the matching configuration.
+    """
+    content = b''.join(
+        'msgid "message {0}"\nmsgstr ""\n\n'.format(index).encode('utf-8')
+        for index in range(size // 30)
+    )
+    localizations = []
+    for directory in range(dirs):
+        target_langs = {}
+        for language in ['en'] + languages:
+            path = os.path.join(root, language, 'dir{0}'.format(directory))
+            os.makedirs(path)
+            for index in range(directory, files, dirs):
+                name = os.path.join(path, 'file{0}.po'.format(index))
+                with open(name, 'wb') as f:
+                    f.write(content)
+            target_langs[language] = '{0}/'.format(path)
+        localizations.append({
+            'source_path': os.path.join(target_langs.pop('en'), '*.po'),
+            'remote_path': 'bench/dir{0}/'.format(directory),
+            'target_langs': target_langs,
+        })
+    return {
+        'project_name': 'test-project',
+        'api_key': 'bench',
+        'localizations': localizations,
+    }
+
+
+def measure(name, func, *args, **kwargs):
+    metrics = Metrics()
+    kwargs['metrics'] = metrics
+    tracemalloc.start()
+    start = time.time()
+    func(*args, **kwargs)
+    seconds = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    files = len(metrics.files)
+    requests = sum(stats['calls'] for stats in metrics.endpoints().values())
+    sys.stdout.write(
+        '{0:<10} {1:>9.2f}s {2:>8} {3:>10.1f} {4:>9} {5:>10.1f}\n'.format(
+            name, seconds, files, files / seconds if seconds else 0,
+            requests, peak / 1024.0 / 1024
+        )
+    )
+
+
+def main():
+    parser = OptionParser(usage='Usage: %prog [options]')
+    parser.add_option('--files', type='int', default=500,
+                      help="Number of source files (default: 500)")
+    parser.add_option('--languages', type='int', default=10,
+                      help="Number of target languages (default: 10)")
+    parser.add_option('--latency', type='float', default=0.005,
+                      help="Latency of the server, in seconds "
+                           "(default: 0.005)")
+    parser.add_option('-j', '--jobs', type='int', default=8,
+                      help="Parallel workers (default: 8)")
+    parser.add_option('-b', '--batch-size', type='int', default=1,
+                      help="Files per upload request (default: 1)")
+    options, args = parser.parse_args()
+    logging.getLogger('crowdin').setLevel(logging.WARNING)
+
+    languages = LANGUAGES[:options.languages]
+    queue = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=serve, args=(queue, options.latency, languages)
+    )
+    server.daemon = True
+    server.start()
+    API.root_url = queue.get()
+
+    root = tempfile.mkdtemp()
+    try:
+        conf = generate_project(root, options.files, languages)
+        sys.stdout.write('{0} files, {1} languages, {2}s latency, {3} jobs, '
+                         'batches of {4}\n'.format(
+                             options.files, len(languages), options.latency,
+                             options.jobs, options.batch_size))
+        sys.stdout.write('{0:<10} {1:>10} {2:>8} {3:>10} {4:>9} {5:>10}\n'
+                         .format('scenario', 'time', 'files', 'files/s',
+                                 'requests', 'peak MB'))
+        measure('push', push, conf, include_source=False, jobs=options.jobs,
+                batch_size=options.batch_size)
+        measure('push -a', push, conf, include_source=True,
+                jobs=options.jobs, batch_size=options.batch_size)
+        for localization in conf['localizations']:
+            for language in localization['target_langs']:
+                localization['target_langs'][language] = os.path.join(
+                    root, 'pull', language, localization['remote_path']
+                )
+        measure('pull', pull, conf, jobs=options.jobs)
+        sys.stdout.write('max RSS: {0:.1f} MB\n'.format(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+        ))
+    finally:
+        shutil.rmtree(root)
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main()
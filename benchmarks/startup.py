@@ -0,0 +1,72 @@
+"""
+Measures the startup time of the command line, over the startup time of a
+bare interpreter, and fails if it exceeds its budget.
+
+    PYTHONPATH=. python benchmarks/startup.py --runs 20
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from optparse import OptionParser
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, 'scripts', 'crowdin')
+
+# milliseconds over the interpreter startup
+BUDGETS = [
+    ('--version', ['--version'], 15),
+    ('push --dry-run', ['--dry-run', 'push'], 60),
+]
+
+
+def run_time(args, cwd, runs):
+    """
+    Returns the median wall time of ``runs`` executions, in milliseconds.
+    """
+    # the commands run in another directory, crowdin is imported from here
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    times = []
+    for index in range(runs):
+        start = time.time()
+        subprocess.check_call([sys.executable] + args, cwd=cwd, env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        times.append((time.time() - start) * 1000)
+    return sorted(times)[len(times) // 2]
+
+
+def main():
+    parser = OptionParser(usage='Usage: %prog [options]')
+    parser.add_option('--runs', type='int', default=10,
+                      help="Runs of each command (default: 10)")
+    options, args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        # a project without localizations, planned without any request
+        with open(os.path.join(root, '.crowdin'), 'w') as f:
+            f.write(json.dumps({'project_name': 'bench', 'api_key': 'bench',
+                                'localizations': []}))
+        baseline = run_time(['-c', 'pass'], root, options.runs)
+        sys.stdout.write('interpreter: {0:.1f}ms\n'.format(baseline))
+        over = False
+        for name, args, budget in BUDGETS:
+            overhead = run_time([SCRIPT] + args, root, options.runs) - baseline
+            sys.stdout.write('{0:<16} {1:>7.1f}ms (budget {2}ms){3}\n'.format(
+                name, overhead, budget, '  OVER BUDGET' if overhead > budget
+                else ''
+            ))
+            over = over or overhead > budget
+    finally:
+        shutil.rmtree(root)
+    if over:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
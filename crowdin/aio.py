@@ -0,0 +1,146 @@
+"""
+asyncio counterparts of ``crowdin.api.API`` and of the ``push`` and ``pull``
+entry points of ``crowdin.client``, for Python 3.5+.
+
+The requests are performed by a synchronous ``API`` in a thread pool, so at
+most ``concurrency`` requests run at the same time over a shared connection
+pool.
+"""
+import asyncio
+import functools
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .api import API
+from .archive import ArchiveReader
+from .client import (extract_one, prepare_pull, prepare_push, report_pull,
+                     report_push, upload_one)
+
+
+logger = logging.getLogger('crowdin')
+
+# Python 3.7+
+get_running_loop = getattr(asyncio, 'get_running_loop',
+                           asyncio.get_event_loop)
+
+
+class AsyncAPI(object):
+
+    def __init__(self, project_name=None, api_key=None, concurrency=10,
+                 **kwargs):
+        self.api = API(project_name=project_name, api_key=api_key,
+                       pool_size=concurrency, **kwargs)
+        self.concurrency = concurrency
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.api.close()
+
+    async def aclose(self):
+        """
+        Closes the API once the requests in progress are done, without
+        blocking the event loop.
+        """
+        await get_running_loop().run_in_executor(None, self.close)
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs ``func(*args, **kwargs)`` in the thread pool.
+        """
+        return await get_running_loop().run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def info(self):
+        return await self.run(self.api.info)
+
+    async def exists(self, name, info=None):
+        if info is None:
+            info = await self.info()
+        return self.api.exists(name, info)
+
+    async def mkdir(self, name, info=None):
+        return await self.run(self.api.mkdir, name, info)
+
+    async def put(self, local, target, info=None, lang=None):
+        if info is None:
+            info = await self.info()
+        return await self.run(self.api.put, local, target, info, lang=lang)
+
+    async def export(self):
+        return await self.run(self.api.export)
+
+    async def translations(self, cache=None, language='all'):
+        return await self.run(self.api.translations, cache=cache,
+                              language=language)
+
+
+async def upload(api, uploads, info, state=None):
+    """
+    Performs the uploads concurrently, source files first. Returns a list of
+    ``(upload, error)`` tuples where error is None for successful uploads.
+    The files are fingerprinted in ``state`` right before being sent.
+    """
+    sources = [item for item in uploads if item.lang is None]
+    translations = [item for item in uploads if item.lang is not None]
+
+    def put(item):
+        if state is not None:
+            state.prepare(*item)
+        return upload_one(api.api, item, info)
+
+    results = []
+    for items in (sources, translations):
+        results.extend(await asyncio.gather(*[
+            api.run(put, item) for item in items
+        ]))
+    return results
+
+
+async def push(conf, include_source, concurrency=10, state=None,
+               force=False):
+    """
+    Pushes the local files to crowdin, performing at most ``concurrency``
+    uploads at the same time. Returns the list of failed ``(upload, error)``.
+    """
+    async with AsyncAPI(project_name=conf['project_name'],
+                        api_key=conf['api_key'],
+                        concurrency=concurrency,
+                        rate_limits=conf.get('rate_limits')) as api:
+        info = await api.info()
+        uploads = await api.run(prepare_push, api.api, conf, info,
+                                include_source, state=state, force=force)
+        results = await upload(api, uploads, info, state=state)
+    return report_push(results, state=state)
+
+
+async def pull(conf, concurrency=10):
+    """
+    Pulls the translations from crowdin, performing at most ``concurrency``
+    extractions at the same time. Returns the list of ``(extraction,
+    written)``.
+    """
+    async with AsyncAPI(project_name=conf['project_name'],
+                        api_key=conf['api_key'],
+                        concurrency=concurrency,
+                        rate_limits=conf.get('rate_limits')) as api:
+        await api.export()
+        translations = ArchiveReader(await api.translations())
+        try:
+            extractions = await api.run(prepare_pull, api.api, conf,
+                                        translations)
+            results = await asyncio.gather(*[
+                api.run(extract_one, translations, item)
+                for item in extractions
+            ])
+        finally:
+            translations.close()
+    return report_pull(list(results))
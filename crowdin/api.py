@@ -1,24 +1,426 @@
-import io
+"""
+The crowdin API. ``requests``, ``zipfile`` and ``xml.etree`` are imported by
+the methods using them, so importing this module stays cheap.
+"""
 import json
 import logging
-import requests
-import zipfile
+import os
+import threading
+import time
 
-from xml.etree import ElementTree
+from collections import deque, namedtuple, OrderedDict
 
 logger = logging.getLogger('crowdin')
 
 
 class CrowdinException(Exception):
-    pass
+    """
+    An error reported by crowdin: ``code`` is the crowdin error code and
+    ``status`` the HTTP status of the response, if known. ``retriable``
+    errors may not happen if the request is sent again later.
+    """
+    retriable = False
+
+    def __init__(self, message, code=None, status=None):
+        super(CrowdinException, self).__init__(message)
+        self.message = message
+        self.code = code
+        self.status = status
+
+    def __str__(self):
+        if self.code is not None:
+            return '{0} (code {1})'.format(self.message, self.code)
+        return self.message
+
+
+class ServerError(CrowdinException):
+    """
+    A 5xx response, which may contain a HTML page instead of XML.
+    """
+    retriable = True
+
+
+class ThrottledError(CrowdinException):
+    """
+    A 429 response, still received after slowing down.
+    """
+    retriable = True
+
+
+class InvalidResponse(CrowdinException):
+    """
+    A successful response whose body is not the expected XML document.
+    """
+
+
+Batch = namedtuple('Batch', 'url params uploads')
+
+
+def root_tag(content):
+    """
+    Returns the tag of the root element of an XML document given as bytes,
+    parsing it only up to that element.
+    """
+    import io
+    from xml.etree import ElementTree
+    for event, element in ElementTree.iterparse(io.BytesIO(content),
+                                                events=('start',)):
+        return element.tag
+
+
+def response_error(response):
+    """
+    Returns the ``CrowdinException`` describing an error response.
+    """
+    from xml.etree import ElementTree
+    status = response.status_code
+    code = message = None
+    try:
+        parsed = ElementTree.fromstring(response.content)
+    except ElementTree.ParseError:
+        pass
+    else:
+        code = parsed.findtext('code')
+        code = int(code) if code and code.strip().isdigit() else None
+        message = parsed.findtext('message')
+    message = message or 'Unexpected response (HTTP {0})'.format(status)
+
+    if status == 429:
+        return ThrottledError(message, code, status)
+    if status >= 500:
+        return ServerError(message, code, status)
+    if status == 200:
+        return InvalidResponse(message, code, status)
+    return CrowdinException(message, code, status)
+
+
+def check_response(response):
+    """
+    Raises the ``CrowdinException`` describing a response, unless its status
+    is 200.
+    """
+    if response.status_code != 200:
+        raise response_error(response)
+
+
+def check_success(response):
+    """
+    Raises the ``CrowdinException`` describing a response, unless it is a
+    ``<success>`` XML document. Only the root tag of successful responses is
+    parsed.
+    """
+    from xml.etree import ElementTree
+    check_response(response)
+    try:
+        tag = root_tag(response.content)
+    except ElementTree.ParseError:
+        tag = None
+    if tag != 'success':
+        raise response_error(response)
+
+
+class ProjectTree(object):
+    """
+    The remote files of a project, as returned by the info API call, indexed
+    by path.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.nodes = {}
+        # set when an API call disagrees with the tree
+        self.stale = False
+        self.index(data.get('files', []))
+
+    def index(self, nodes, prefix=''):
+        for node in nodes:
+            path = prefix + node['name']
+            self.nodes[path] = node
+            if 'files' in node:
+                self.index(node['files'], '{0}/'.format(path))
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __contains__(self, path):
+        return path in self.nodes
+
+    def add(self, path, node_type):
+        """
+        Adds a node created remotely, so the project information doesn't need
+        to be fetched again.
+        """
+        parent, _, name = path.rpartition('/')
+        node = {'name': name, 'node_type': node_type}
+        if node_type == 'directory':
+            node['files'] = []
+        siblings = self.nodes[parent]['files'] if parent \
+            else self.data.setdefault('files', [])
+        siblings.append(node)
+        self.nodes[path] = node
+
+
+def retry_after(response, now=None):
+    """
+    Returns the delay in seconds requested by the ``Retry-After`` header of a
+    response, or None.
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        from email.utils import mktime_tz, parsedate_tz
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0.0, mktime_tz(date) - (now or time.time()))
+
+
+class TokenBucket(object):
+    """
+    Allows ``rate`` requests per second on average, and bursts of ``burst``
+    requests. A None ``rate`` doesn't limit the requests.
+    """
+
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.time()
+        # request times of the last second, to measure the actual rate
+        self.sent = deque()
+
+    def take(self, now):
+        """
+        Takes a token and returns 0, or returns the seconds to wait until a
+        token is available.
+        """
+        if self.rate is not None:
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+        self.sent.append(now)
+        while self.sent[0] < now - 1:
+            self.sent.popleft()
+        return 0
+
+
+class RateLimiter(object):
+    """
+    Client side rate limiting of the API calls, shared by all the workers.
+
+    Each endpoint has its own token bucket, ``rates`` maps endpoint names
+    (``add-file``, ``download``...) to requests per second, the ``default``
+    rate applies to the other endpoints. Endpoints without a rate are not
+    limited until they get throttled.
+
+    A throttling response pauses every request until its ``Retry-After``
+    delay, or an exponential backoff, has passed, and halves the rate of the
+    endpoint. The rate then grows back by about ``recovery`` requests per
+    second every second, up to its configured value.
+    """
+
+    def __init__(self, rates=None, burst=5, min_rate=0.1, recovery=0.5,
+                 backoff=1.0, max_backoff=60.0):
+        self.rates = dict(rates or {})
+        self.burst = burst
+        self.min_rate = min_rate
+        self.recovery = recovery
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.buckets = {}
+        self.paused_until = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def bucket(self, endpoint):
+        name = endpoint.partition('/')[0]
+        if name not in self.buckets:
+            self.buckets[name] = TokenBucket(
+                self.rates.get(name, self.rates.get('default')), self.burst
+            )
+        return self.buckets[name]
+
+    def acquire(self, endpoint):
+        """
+        Blocks until a request to ``endpoint`` is allowed, returns the seconds
+        waited.
+        """
+        waited = 0
+        while True:
+            with self.lock:
+                now = time.time()
+                delay = self.paused_until - now
+                if delay <= 0:
+                    delay = self.bucket(endpoint).take(now)
+                    if not delay:
+                        return waited
+            time.sleep(delay)
+            waited += delay
+
+    def success(self, endpoint):
+        with self.lock:
+            self.throttled = 0
+            bucket = self.bucket(endpoint)
+            if bucket.rate is not None and bucket.rate != bucket.max_rate:
+                bucket.rate += self.recovery / bucket.rate
+                if bucket.max_rate is not None:
+                    bucket.rate = min(bucket.rate, bucket.max_rate)
+
+    def throttle(self, endpoint, delay=None):
+        """
+        Slows down after a throttling response, pausing every request for
+        ``delay`` seconds if given.
+        """
+        with self.lock:
+            self.throttled += 1
+            bucket = self.bucket(endpoint)
+            rate = bucket.rate or len(bucket.sent) or 1
+            bucket.rate = max(self.min_rate, rate / 2.0)
+            bucket.tokens = 0
+            if delay is None:
+                delay = min(self.max_backoff,
+                            self.backoff * 2 ** (self.throttled - 1))
+            self.paused_until = max(self.paused_until, time.time() + delay)
+        logger.warning("Throttled by crowdin on {0}, pausing {1:.1f}s and "
+                       "slowing down to {2:.1f} requests/s".format(
+                           endpoint, delay, bucket.rate))
 
 
 class API(object):
     root_url = "http://api.crowdin.net/api"
 
-    def __init__(self, project_name=None, api_key=None):
+    # transient server errors worth retrying
+    retry_statuses = (500, 502, 503, 504)
+
+    # responses asking to slow down, retried once the rate limiter allows it
+    throttle_statuses = (429,)
+
+    # default size limit of the files uploaded in a single request
+    batch_bytes = 10 * 1024 * 1024
+
+    # error codes meaning that the project doesn't match its ``ProjectTree``:
+    # existing file or directory, missing file or directory
+    stale_errors = {
+        'add-directory': (13,),
+        'add-file': (5, 17),
+        'update-file': (8,),
+        'upload-translation': (8,),
+    }
+
+    def __init__(self, project_name=None, api_key=None, pool_size=10,
+                 retries=3, backoff=0.5, metrics=None, rate_limits=None,
+                 limiter=None, throttle_retries=5, session=None, slots=None):
         self.project_name = project_name
         self.api_key = api_key
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.metrics = metrics
+        self.limiter = limiter or RateLimiter(rate_limits)
+        self.throttle_retries = throttle_retries
+        # a session shared with other API instances is not closed
+        self.shared_session = session is not None
+        self._session = session
+        # semaphore limiting the requests in progress, may be shared too
+        self.slots = slots
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def session(self):
+        """
+        The HTTP session, keeping connections alive between requests.
+        """
+        if self._session is None:
+            self._session = self.create_session()
+        return self._session
+
+    def create_session(self):
+        return self.connect(self.pool_size, self.retries, self.backoff)
+
+    @classmethod
+    def connect(cls, pool_size=10, retries=3, backoff=0.5):
+        """
+        Returns a new HTTP session, keeping up to ``pool_size`` connections
+        alive. It can be shared by several API instances.
+        """
+        from .session import connect
+        return connect(pool_size, retries, backoff, cls.retry_statuses)
+
+    def close(self):
+        if self._session is not None and not self.shared_session:
+            self._session.close()
+            self._session = None
+
+    def throttled(self, response):
+        return response.status_code in self.throttle_statuses or (
+            response.status_code in self.retry_statuses and
+            'Retry-After' in response.headers
+        )
+
+    def request(self, method, url, **kwargs):
+        """
+        Performs a request with the session once the rate limiter allows it,
+        recording it in ``metrics``. Throttling responses slow down the
+        limiter and are retried up to ``throttle_retries`` times.
+        """
+        endpoint = url[len(self.project_url) + 1:]
+        data = kwargs.get('data')
+        for attempt in range(self.throttle_retries + 1):
+            self.limiter.acquire(endpoint)
+            start = time.time()
+            if self.slots is not None:
+                with self.slots:
+                    response = getattr(self.session, method)(url, **kwargs)
+            else:
+                response = getattr(self.session, method)(url, **kwargs)
+            if self.metrics is not None:
+                received = response.headers.get('Content-Length')
+                if received is None and not kwargs.get('stream'):
+                    received = len(response.content)
+                retries = getattr(response.raw, 'retries', None)
+                self.metrics.record_call(
+                    endpoint=endpoint,
+                    seconds=time.time() - start,
+                    sent=len(data) if data is not None else 0,
+                    received=int(received or 0),
+                    retries=len(retries.history) if retries else 0,
+                    status=response.status_code,
+                )
+            if not self.throttled(response):
+                self.limiter.success(endpoint)
+                break
+            self.limiter.throttle(endpoint, retry_after(response))
+            if attempt < self.throttle_retries:
+                response.close()
+                if hasattr(data, 'seek'):
+                    data.seek(0)
+        return response
+
+    def check_tree(self, response, url, info=None):
+        """
+        Checks that a response is a success, marking ``info`` as stale if the
+        error shows that the project doesn't match it.
+        """
+        try:
+            check_success(response)
+        except CrowdinException as ex:
+            endpoint = url[len(self.project_url) + 1:]
+            if info is not None and \
+                    ex.code in self.stale_errors.get(endpoint, ()):
+                info.stale = True
+            raise
 
     def params(self, **params):
         params['key'] = self.api_key
@@ -34,10 +436,10 @@ class API(object):
 
     def info(self):
         logger.debug("Fetching project information")
-        response = requests.get(self.info_url, params=self.params(json=True))
-        if response.status_code != 200:
-            raise CrowdinException(response.text)
-        return json.loads(response.content)
+        response = self.request('get', self.info_url,
+                                params=self.params(json=True))
+        check_response(response)
+        return ProjectTree(json.loads(response.content))
 
     def exists(self, name, info=None):
         """
@@ -45,27 +447,23 @@ class API(object):
         """
         if info is None:
             info = self.info()
-
-        dirs = name.split('/')
-        for index, name in enumerate(dirs):
-            for f in info['files']:
-                if f['name'] == name:
-                    info = f
-                    break
-            else:
-                return False
-        return True
+        return name in info
 
     @property
     def mkdir_url(self):
         return '{0}/add-directory'.format(self.project_url)
 
-    def mkdir(self, name):
+    def mkdir(self, name, info=None):
+        """
+        Creates a remote directory, its parent must exist. The directory is
+        added to ``info`` if given.
+        """
         logger.debug("Creating remote directory {0}".format(name))
-        response = requests.post(self.mkdir_url, params=self.params(name=name))
-        parsed = ElementTree.fromstring(response.text)
-        if parsed.tag != 'success':
-            raise CrowdinException(response.text)
+        response = self.request('post', self.mkdir_url,
+                                params=self.params(name=name))
+        self.check_tree(response, self.mkdir_url, info)
+        if info is not None:
+            info.add(name, 'directory')
 
     @property
     def put_url(self):
@@ -79,6 +477,22 @@ class API(object):
     def upload_translation_url(self):
         return '{0}/upload-translation'.format(self.project_url)
 
+    def endpoint(self, target, info, lang=None):
+        """
+        Returns the url and the parameters of the request uploading a file to
+        a remote path.
+        """
+        params = self.params()
+
+        if lang is not None:
+            url = self.upload_translation_url
+            params['language'] = lang
+        elif self.exists(target, info):
+            url = self.update_url
+        else:
+            url = self.put_url
+        return url, params
+
     def put(self, local, target, info=None, lang=None):
         """
         Uploads a translation file to a remote path.
@@ -94,34 +508,153 @@ class API(object):
         if info is None:
             info = self.info()
 
-        params = self.params()
+        url, params = self.endpoint(target, info, lang)
+        self.post_files(url, params, [(local, target)], info)
 
-        if lang is not None:
-            url = self.upload_translation_url
-            params['language'] = lang
-        elif self.exists(target, info):
-            url = self.update_url
-        else:
-            url = self.put_url
+    def post_files(self, url, params, files, info):
+        """
+        Uploads a list of ``(local, target)`` files in a single request. The
+        files are streamed, and sent as is.
+        """
+        from .multipart import MultipartStream
+        body = MultipartStream(
+            [('files[{0}]'.format(target), local) for local, target in files]
+        )
+        response = self.request(
+            'post', url, params=params, data=body,
+            headers={'Content-Type': body.content_type}
+        )
+        self.check_tree(response, url, info)
+        if url == self.put_url:
+            for local, target in files:
+                info.add(target, 'file')
+
+    def batches(self, uploads, info, max_files=20, max_bytes=None):
+        """
+        Groups ``(local, target, lang)`` uploads by endpoint, in batches of at
+        most ``max_files`` files and ``max_bytes`` bytes (``batch_bytes`` by
+        default). Larger files are sent alone.
+        """
+        if max_bytes is None:
+            max_bytes = self.batch_bytes
+        groups = OrderedDict()
+        for item in uploads:
+            local, target, lang = item
+            url, params = self.endpoint(target, info, lang)
+            groups.setdefault((url, lang), (params, []))[1].append(item)
 
-        with open(local, 'r') as f:
-            files = {'files[{0}]'.format(target): f}
-            response = requests.post(url, params=params, files=files)
-        parsed = ElementTree.fromstring(response.text)
-        if parsed.tag != 'success' or response.status_code != 200:
-            raise CrowdinException(response.text)
+        batches = []
+        for (url, lang), (params, items) in groups.items():
+            batch, targets, size = [], set(), 0
+            for item in items:
+                local, target, lang = item
+                try:
+                    item_size = os.path.getsize(local)
+                except OSError:
+                    # sent on its own, its upload fails for this file only
+                    batches.append(Batch(url, params, [item]))
+                    continue
+                if batch and (len(batch) >= max_files or target in targets or
+                              size + item_size > max_bytes):
+                    batches.append(Batch(url, params, batch))
+                    batch, targets, size = [], set(), 0
+                batch.append(item)
+                targets.add(target)
+                size += item_size
+            if batch:
+                batches.append(Batch(url, params, batch))
+        return batches
+
+    def put_batch(self, batch, info):
+        """
+        Uploads a batch of files. If the request fails, the files are uploaded
+        one by one, so the errors are attributed to the right files, unless
+        the error is retriable: it is not caused by the files.
+        Returns a list of ``(upload, error)`` tuples where error is None for
+        successful uploads.
+        """
+        logger.info("Uploading {0} files to {1}".format(
+            len(batch.uploads), ", ".join(item[1] for item in batch.uploads)
+        ))
+        try:
+            self.post_files(batch.url, batch.params,
+                            [item[:2] for item in batch.uploads], info)
+        except (CrowdinException, IOError) as ex:
+            if len(batch.uploads) == 1 or getattr(ex, 'retriable', False):
+                for item in batch.uploads:
+                    logger.error("Uploading {0} failed: {1}".format(
+                        item[0], ex
+                    ))
+                return [(item, ex) for item in batch.uploads]
+            logger.debug("Batch upload failed, uploading files one by one")
+            results = []
+            for item in batch.uploads:
+                results.extend(self.put_batch(
+                    Batch(batch.url, batch.params, [item]), info
+                ))
+            return results
+        return [(item, None) for item in batch.uploads]
 
     @property
     def translations_url(self):
-        return '{0}/download/all.zip'.format(self.project_url)
+        return self.download_url('all')
+
+    def download_url(self, language):
+        return '{0}/download/{1}.zip'.format(self.project_url, language)
+
+    def translations(self, cache=None, language='all', chunk_size=64 * 1024,
+                     spool_size=16 * 1024 * 1024):
+        """
+        Returns a ZipFile with the available remote translations, in all the
+        languages or in a single ``language``.
+
+        The archive is downloaded in chunks of ``chunk_size`` bytes to a
+        temporary file, kept in memory only below ``spool_size`` bytes. If a
+        ``DownloadCache`` is given, the cached archive is revalidated and
+        reused if it was not modified.
+        """
+        import tempfile
+        import zipfile
+
+        key = '{0}-{1}'.format(self.project_name, language)
+        headers = cache.headers(key) if cache is not None else {}
+
+        logger.info("Downloading {0} translations".format(language))
+        response = self.request('get', self.download_url(language),
+                                params=self.params(), headers=headers,
+                                stream=True)
+        if response.status_code == 304:
+            logger.info("Translations not modified, using the cached archive")
+            return zipfile.ZipFile(cache.get(key))
+        check_response(response)
+
+        if cache is not None:
+            path = cache.store(key, response, chunk_size=chunk_size)
+            if path is not None:
+                return zipfile.ZipFile(path)
+
+        archive = tempfile.SpooledTemporaryFile(max_size=spool_size)
+        for chunk in response.iter_content(chunk_size):
+            archive.write(chunk)
+        archive.seek(0)
+        return zipfile.ZipFile(archive)
+
+    @property
+    def export_file_url(self):
+        return '{0}/export-file'.format(self.project_url)
 
-    def translations(self):
+    def export_file(self, name, language):
         """
-        Returns a ZipFile with all the available remote translations.
+        Returns the content of a remote file translated in ``language``.
         """
-        logger.info("Downloading translations")
-        response = requests.get(self.translations_url, params=self.params())
-        return zipfile.ZipFile(io.BytesIO(response.content))
+        logger.info("Downloading {0} translation of {1}".format(
+            language, name
+        ))
+        response = self.request('get', self.export_file_url,
+                                params=self.params(file=name,
+                                                   language=language))
+        check_response(response)
+        return response.content
 
     @property
     def export_url(self):
@@ -129,7 +662,6 @@ class API(object):
 
     def export(self):
         logger.info("Exporting translations")
-        response = requests.post(self.export_url, params=self.params())
-        parsed = ElementTree.fromstring(response.text)
-        if parsed.tag != 'success':
-            raise CrowdinException(response.text)
+        response = self.request('post', self.export_url,
+                                params=self.params())
+        check_success(response)
@@ -0,0 +1,126 @@
+"""
+Reading of the translation archives member by member, in bounded chunks.
+"""
+import mmap
+import struct
+import zipfile
+import zlib
+
+
+# signature and size of a zip local file header
+LOCAL_HEADER = b'PK\x03\x04'
+LOCAL_HEADER_SIZE = 30
+
+
+def archive_fileno(archive):
+    """
+    Returns the file descriptor of a ``ZipFile`` read from disk, or None.
+    """
+    if getattr(archive.fp, '_rolled', True) is False:
+        # SpooledTemporaryFile still in memory
+        return None
+    try:
+        return archive.fp.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class ArchiveReader(object):
+    """
+    Reads the members of a ``ZipFile`` in chunks of at most ``chunk_size``
+    bytes.
+
+    Archives on disk are memory mapped: the chunks of stored members are
+    slices of the mapping, which are not copied before being written, and
+    deflated members are decompressed chunk by chunk from the mapping. Other
+    archives and members are read through ``zipfile``.
+    """
+
+    def __init__(self, archive, chunk_size=64 * 1024):
+        self.archive = archive
+        self.chunk_size = chunk_size
+        self.map = None
+        fileno = archive_fileno(archive)
+        if fileno is not None:
+            try:
+                self.map = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+            except (EnvironmentError, ValueError):
+                pass
+
+    def namelist(self):
+        return self.archive.namelist()
+
+    def getinfo(self, name):
+        return self.archive.getinfo(name)
+
+    def read(self, name):
+        return self.archive.read(name)
+
+    def size(self, name):
+        return self.archive.getinfo(name).file_size
+
+    def chunks(self, name):
+        """
+        Yields the content of a member, in chunks.
+        """
+        info = self.archive.getinfo(name)
+        if self.map is None or info.flag_bits & 0x1 or \
+                info.compress_type not in (zipfile.ZIP_STORED,
+                                           zipfile.ZIP_DEFLATED):
+            return self.stream(name)
+        return self.mapped_chunks(info)
+
+    def stream(self, name):
+        member = self.archive.open(name)
+        try:
+            for chunk in iter(lambda: member.read(self.chunk_size), b''):
+                yield chunk
+        finally:
+            member.close()
+
+    def mapped_chunks(self, info):
+        offset = info.header_offset
+        header = self.map[offset:offset + LOCAL_HEADER_SIZE]
+        if header[:4] != LOCAL_HEADER:
+            raise zipfile.BadZipfile(
+                "Bad local header for {0}".format(info.filename)
+            )
+        name_length, extra_length = struct.unpack('<HH', header[26:30])
+        start = offset + LOCAL_HEADER_SIZE + name_length + extra_length
+        data = memoryview(self.map)[start:start + info.compress_size]
+
+        crc = 0
+        if info.compress_type == zipfile.ZIP_STORED:
+            for index in range(0, len(data), self.chunk_size):
+                chunk = data[index:index + self.chunk_size]
+                crc = zlib.crc32(chunk, crc)
+                yield chunk
+        else:
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            for index in range(0, len(data), self.chunk_size):
+                chunk = decompressor.decompress(
+                    data[index:index + self.chunk_size], self.chunk_size
+                )
+                while chunk:
+                    crc = zlib.crc32(chunk, crc)
+                    yield chunk
+                    chunk = decompressor.decompress(
+                        decompressor.unconsumed_tail, self.chunk_size
+                    )
+            chunk = decompressor.flush()
+            if chunk:
+                crc = zlib.crc32(chunk, crc)
+                yield chunk
+        if crc & 0xffffffff != info.CRC:
+            raise zipfile.BadZipfile(
+                "Bad CRC-32 for {0}".format(info.filename)
+            )
+
+    def close(self):
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                # chunks still referenced, unmapped once they are collected
+                pass
+            self.map = None
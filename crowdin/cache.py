@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+import pickle
+import re
+
+from .state import replace
+
+
+logger = logging.getLogger('crowdin')
+
+
+def default_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'crowdin')
+
+
+class DownloadCache(object):
+    """
+    On-disk cache of the downloaded translation archives.
+
+    Archives are stored with the ``ETag`` and ``Last-Modified`` headers of
+    their response, used to revalidate them with a conditional request. The
+    least recently used archives are evicted once the cache grows larger than
+    ``max_size`` bytes.
+    """
+
+    def __init__(self, directory=None, max_size=512 * 1024 * 1024):
+        self.directory = directory or default_cache_dir()
+        self.max_size = max_size
+
+    def path(self, key):
+        return os.path.join(self.directory,
+                            '{0}.zip'.format(re.sub(r'[^\w.-]', '_', key)))
+
+    def meta_path(self, key):
+        return '{0}.json'.format(self.path(key))
+
+    def headers(self, key):
+        """
+        Returns the headers of a request revalidating the cached archive.
+        """
+        if not os.path.exists(self.path(key)) or \
+                not os.path.exists(self.meta_path(key)):
+            return {}
+        with open(self.meta_path(key), 'r') as f:
+            meta = json.loads(f.read())
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def get(self, key):
+        """
+        Returns the path of the cached archive, marking it as recently used.
+        """
+        path = self.path(key)
+        os.utime(path, None)
+        return path
+
+    def store(self, key, response, chunk_size=64 * 1024):
+        """
+        Stores the archive of a streamed response, returns its path or None
+        if the response can't be revalidated.
+        """
+        meta = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+        if not meta['etag'] and not meta['last_modified']:
+            return None
+
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        path = self.path(key)
+        tmp_path = '{0}.tmp'.format(path)
+        with open(tmp_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size):
+                f.write(chunk)
+        replace(tmp_path, path)
+        with open(self.meta_path(key), 'w') as f:
+            f.write(json.dumps(meta))
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used archives until the cache fits in
+        ``max_size``, ``keep`` is never removed.
+        """
+        archives = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.zip') and path != keep:
+                stat = os.stat(path)
+                archives.append((stat.st_mtime, stat.st_size, path))
+        size = sum(archive[1] for archive in archives)
+        if keep is not None:
+            size += os.path.getsize(keep)
+
+        for mtime, archive_size, path in sorted(archives):
+            if size <= self.max_size:
+                break
+            logger.debug("Evicting {0} from the cache".format(path))
+            os.remove(path)
+            if os.path.exists('{0}.json'.format(path)):
+                os.remove('{0}.json'.format(path))
+            size -= archive_size
+
+
+class ProjectSnapshot(object):
+    """
+    The ``ProjectTree`` of a project pickled on disk, so a push can start
+    without fetching the project information.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self, project_name):
+        """
+        Returns the snapshot of ``project_name``, or None.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                name, tree = pickle.load(f)
+        except Exception as ex:
+            if os.path.exists(self.path):
+                logger.debug("Can't read the project snapshot: {0}".format(
+                    ex
+                ))
+            return None
+        if name != project_name:
+            return None
+        logger.debug("Using the project snapshot {0}".format(self.path))
+        return tree
+
+    def save(self, project_name, tree):
+        tmp_path = '{0}.tmp'.format(self.path)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((project_name, tree), f, pickle.HIGHEST_PROTOCOL)
+        replace(tmp_path, self.path)
+
+    def invalidate(self):
+        if os.path.exists(self.path):
+            logger.debug("Removing the project snapshot {0}".format(
+                self.path
+            ))
+            os.remove(self.path)
@@ -1,123 +1,303 @@
 import fnmatch
-import glob
 import logging
 import os
+import time
 
-from .api import API
+from collections import namedtuple
 
-
-logger = logging.getLogger('crowdin')
+from .api import API, CrowdinException, ProjectTree
+from .metrics import Metrics
+from .plan import is_dir, plan_pull, plan_push
+from .state import replace
 
 
-def is_dir(name):
-    return name[-1] == '/'
+logger = logging.getLogger('crowdin')
 
 
-def push_dir(api, localization, info,  include_source):
-    structure_changed = False
-    remote_path = localization['remote_path']
-    if not is_dir(remote_path):
-        logger.warning(
-            "source_path returns multiple files but remote_path[{0}] "
-            "is not a directory".format(remote_path)
+Extraction = namedtuple('Extraction', 'zip_name target')
+
+
+def make_dirs(api, plan):
+    """
+    Creates the remote directories of a push plan, parents first.
+    """
+    for name in plan.mkdirs:
+        api.mkdir(name, plan.info)
+
+
+def upload_one(api, item, info):
+    """
+    Performs an upload, returns an ``(upload, error)`` tuple.
+    """
+    start = time.time()
+    try:
+        api.put(item.local, item.remote, info, lang=item.lang)
+    except (CrowdinException, IOError) as ex:
+        logger.error("Uploading {0} failed: {1}".format(item.local, ex))
+        return item, ex
+    finally:
+        if api.metrics is not None:
+            api.metrics.record_file(item.local, time.time() - start, 'upload')
+    return item, None
+
+
+def upload(api, uploads, info, jobs=1, batch_size=1, journal=None,
+           retry=True, state=None, batch_bytes=None):
+    """
+    Performs the uploads using a pool of ``jobs`` threads, sending up to
+    ``batch_size`` files and ``batch_bytes`` bytes per request. Failures don't
+    stop the other uploads, returns a list of ``(upload, error)`` tuples where
+    error is None for successful uploads. Successful uploads are recorded in
+    ``journal``.
+
+    The files are fingerprinted in ``state`` right before being sent, see
+    ``State.prepare``.
+
+    Uploads failing with a retriable error (server errors, throttling) are
+    attempted again once the others are done, one request at a time, if
+    ``retry`` is True.
+
+    Source files are all uploaded before the translations, a translation
+    can only be uploaded once its source file exists remotely.
+    """
+    sources = [item for item in uploads if item.lang is None]
+    translations = [item for item in uploads if item.lang is not None]
+
+    if batch_size > 1:
+        def put(batch):
+            start = time.time()
+            results = api.put_batch(batch, info)
+            if api.metrics is not None:
+                seconds = time.time() - start
+                for item in batch.uploads:
+                    api.metrics.record_file(item.local, seconds, 'batch')
+            return results
+        stages = [api.batches(items, info, max_files=batch_size,
+                              max_bytes=batch_bytes)
+                  for items in (sources, translations)]
+    else:
+        def put(item):
+            return [upload_one(api, item, info)]
+        stages = [sources, translations]
+
+    def run(work):
+        if state is not None:
+            for item in getattr(work, 'uploads', [work]):
+                state.prepare(*item)
+        results = put(work)
+        if journal is not None:
+            for item, error in results:
+                if error is None:
+                    data = {}
+                    if state is not None:
+                        # recorded in the state on resume
+                        data['state'] = state.prepared(*item)
+                    journal.record('push', *item, **data)
+        return results
+
+    results = []
+    if jobs > 1 and len(uploads) > 1:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(min(jobs, len(uploads)))
+        try:
+            for stage in stages:
+                for stage_results in pool.map(run, stage):
+                    results.extend(stage_results)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for stage in stages:
+            for work in stage:
+                results.extend(run(work))
+
+    retried = set(item for item, error in results
+                  if getattr(error, 'retriable', False))
+    if retry and retried:
+        logger.warning("Retrying {0} uploads which failed with a server "
+                       "error".format(len(retried)))
+        results = [(item, error) for item, error in results
+                   if item not in retried] + upload(
+            api, [item for item in uploads if item in retried], info,
+            batch_size=batch_size, journal=journal, retry=False, state=state,
+            batch_bytes=batch_bytes
         )
-        return
-
-    # remove trailing slash
-    dirs = remote_path.split('/')[:-1]
-
-    for index in range(len(dirs)):
-        name = "/".join(dirs[:index + 1])
-        if not api.exists(name, info):
-            api.mkdir(name)
-            structure_changed = True
-
-    if structure_changed:
-        info = api.info()
-
-    source_files = glob.glob(localization['source_path'])
-
-    excluded = localization.get('excluded', "").split(",")
-    for source_file in source_files:
-        file_name = os.path.split(source_file)[-1]
-        if excluded and \
-                [True for p in excluded if fnmatch.fnmatch(file_name, p)]:
-            continue
-        remote_file = os.path.join(remote_path, file_name)
-
-        # Upload reference translations
-        api.put(source_file, remote_file, info)
-
-        if not include_source:
-            continue
-
-        # Upload local translations
-        for lang, path in localization['target_langs'].items():
-
-            if not is_dir(path):
-                logger.warning(
-                    "source_path returns multiple files but target_langs[{0}] "
-                    "is not a directory".format(path)
-                )
-            lang_src_file = os.path.join(path, file_name)
-            if os.path.exists(lang_src_file):
-                api.put(lang_src_file, remote_file, info, lang=lang)
-            else:
-                logger.debug(
-                    "Non-existing local {0} translation, skipping".format(lang)
-                )
-    return info
-
-
-def push_file(api, localization, info, include_source):
-
-    structure_changed = False
-    dirs = localization['remote_path'].split('/')[:-1]
-    for index in range(len(dirs)):
-        name = "/".join(dirs[:index + 1])
-        if not api.exists(name, info):
-            api.mkdir(name)
-            structure_changed = True
-
-    if structure_changed:
-        info = api.info()
-
-    # Upload reference translations
-    api.put(localization['source_path'],
-            localization['remote_path'], info)
-
-    if not include_source:
-        return
-
-    # Upload local translations
-    for lang, path in localization['target_langs'].items():
-        if os.path.exists(path):
-            api.put(path, localization['remote_path'], info, lang=lang)
-        else:
-            logger.debug(
-                "Inexisting local {0} translation, skipping".format(lang)
-            )
-    return info
-
-
-def push(conf, include_source):
-    api = API(project_name=conf['project_name'], api_key=conf['api_key'])
-    info = api.info()
-
-    for localization in conf['localizations']:
-        if '*' in localization['source_path']:
-            info = push_dir(api, localization, info, include_source)
-        else:
-            info = push_file(api, localization, info, include_source)
+    return results
+
+
+def prepare_push(api, conf, info, include_source, state=None, force=False):
+    """
+    Plans the push, creates the remote directories and returns the list of
+    uploads to perform. See ``plan_push``.
+    """
+    plan = plan_push(conf, info, include_source, state=state, force=force)
+    if state is not None and not force:
+        logger.info("Skipping {0} unchanged files".format(len(plan.skips)))
+    make_dirs(api, plan)
+    return plan.uploads
+
+
+def push_plan(conf, include_source, state=None, force=False):
+    """
+    Returns the ``PushPlan`` of a push, without performing it.
+    """
+    info = ProjectTree({})
+    if conf['localizations']:
+        with API(project_name=conf['project_name'],
+                 api_key=conf['api_key']) as api:
+            info = api.info()
+    return plan_push(conf, info, include_source, state=state, force=force)
+
+
+def report_push(results, state=None):
+    """
+    Records the successful uploads in ``state``, as they were fingerprinted
+    before being sent, and returns the list of failed ``(upload, error)``.
+    """
+    failed = [(item, error) for item, error in results if error is not None]
+
+    if state is not None:
+        for item, error in results:
+            if error is None:
+                state.record(*item)
+        state.save()
+
+    logger.info("{0} files uploaded, {1} failed".format(
+        len(results) - len(failed), len(failed)
+    ))
+    return failed
+
+
+def fetch_info(api, snapshot=None, trust_cache=False):
+    """
+    Returns the ``ProjectTree`` of the project, from the ``snapshot`` if
+    ``trust_cache`` is True and it exists.
+    """
+    if trust_cache and snapshot is not None:
+        info = snapshot.load(api.project_name)
+        if info is not None:
+            logger.info("Using the cached project information")
+            return info
+    return api.info()
+
+
+def refresh_info(api, snapshot=None):
+    logger.warning("The project information is out of date, fetching it "
+                   "again")
+    if snapshot is not None:
+        snapshot.invalidate()
+    return api.info()
+
+
+def push(conf, include_source, jobs=1, state=None, force=False,
+         batch_size=1, metrics=None, journal=None, session=None, slots=None,
+         snapshot=None, trust_cache=False, limiter=None, batch_bytes=None):
+    """
+    Pushes the local files to crowdin. Remote directories are created first,
+    then files are uploaded by ``jobs`` parallel workers, up to
+    ``batch_size`` files and ``batch_bytes`` bytes per request. Measurements
+    are recorded in ``metrics``.
+
+    A ``session``, ``slots`` semaphore and ``RateLimiter`` shared with other
+    pushes or pulls may be given, see ``API``.
+
+    Uploads already recorded in the ``journal`` are skipped, it is removed
+    once every upload succeeded.
+
+    The project information is saved to the ``ProjectSnapshot``, and read
+    from it instead of being fetched if ``trust_cache`` is True. When the
+    project doesn't match it, it is fetched again and the failed operations
+    are performed again.
+
+    Returns the list of failed ``(upload, error)``.
+    """
+    if metrics is None:
+        metrics = Metrics()
+    failed = None
+    try:
+        with API(project_name=conf['project_name'], api_key=conf['api_key'],
+                 pool_size=jobs, metrics=metrics,
+                 rate_limits=conf.get('rate_limits'), limiter=limiter,
+                 session=session, slots=slots) as api:
+            with metrics.phase('info'):
+                info = fetch_info(api, snapshot, trust_cache)
+            with metrics.phase('prepare'):
+                try:
+                    uploads = prepare_push(api, conf, info, include_source,
+                                           state=state, force=force)
+                except CrowdinException:
+                    if not info.stale:
+                        raise
+                    info = refresh_info(api, snapshot)
+                    uploads = prepare_push(api, conf, info, include_source,
+                                           state=state, force=force)
+                if journal is not None:
+                    remaining = skip_completed(uploads, journal, 'push')
+                    if state is not None:
+                        record_completed(uploads, remaining, journal, state)
+                    uploads = remaining
+            with metrics.phase('upload'):
+                results = upload(api, uploads, info, jobs=jobs,
+                                 batch_size=batch_size, journal=journal,
+                                 state=state, batch_bytes=batch_bytes)
+                if info.stale:
+                    info = refresh_info(api, snapshot)
+                    retried = set(item for item, error in results
+                                  if error is not None)
+                    uploads = [item for item in prepare_push(
+                        api, conf, info, include_source, state=state,
+                        force=force
+                    ) if item in retried]
+                    results = [(item, error) for item, error in results
+                               if error is None] + upload(
+                        api, uploads, info, jobs=jobs, batch_size=batch_size,
+                        journal=journal, state=state, batch_bytes=batch_bytes
+                    )
+            if snapshot is not None and not info.stale:
+                snapshot.save(conf['project_name'], info)
+        failed = report_push(results, state=state)
+    finally:
+        if journal is not None:
+            journal.close(finished=failed == [])
+    return failed
+
+
+def skip_completed(operations, journal, action):
+    """
+    Returns the operations which were not completed according to the
+    ``journal``.
+    """
+    remaining = [item for item in operations
+                 if (action,) + tuple(item) not in journal]
+    if len(remaining) != len(operations):
+        logger.info("Skipping {0} operations completed by the previous "
+                    "run".format(len(operations) - len(remaining)))
+    return remaining
+
+
+def record_completed(uploads, remaining, journal, state):
+    """
+    Records in ``state`` the uploads completed by the previous run, as they
+    were when they were uploaded.
+    """
+    remaining = set(remaining)
+    for item in uploads:
+        if item not in remaining:
+            data = journal.get(('push',) + tuple(item)) or {}
+            state.record(*item, entry=data.get('state'))
 
 
 def pull_file(api, localization, translations):
+    """
+    Returns the extractions needed for a single file localization.
+    """
+    extractions = []
     for language, path in localization['target_langs'].items():
 
         zip_path = '{0}/{1}'.format(language, localization['remote_path'])
 
         try:
-            translated = translations.read(zip_path)
+            translations.getinfo(zip_path)
         except KeyError:
             logger.info("No {0} translation found".format(language))
             continue
@@ -130,55 +310,467 @@ def pull_file(api, localization, translations):
                 logging.error(ex)
                 if ex.errno != 17:
                     raise
-        logger.info("Writing {0}".format(path))
-        with open(path, 'wb') as f:
-            f.write(translated)
-
-
-def pull_dir(api, localization, translations):
-
+        extractions.append(Extraction(zip_path, path))
+    return extractions
+
+
+def index_translations(translations):
+    """
+    Indexes the files of the translations archive by language and remote
+    directory. Returns a dict of ``(language, remote_dir)`` to a list of
+    ``(zip_name, file_name)``.
+    """
+    index = {}
+    for zip_name in translations.namelist():
+        if zip_name.endswith('/'):
+            # don't care about folders, they will be created with
+            # os.makedirs later
+            continue
+        language, _, path = zip_name.partition('/')
+        remote_dir, _, file_name = path.rpartition('/')
+        key = (language, "{0}/".format(remote_dir))
+        index.setdefault(key, []).append((zip_name, file_name))
+    return index
+
+
+def pull_dir(api, localization, translations, index):
+    """
+    Returns the extractions needed for a directory localization, including
+    the subdirectories of ``remote_path`` if ``source_path`` contains ``**``.
+    """
+    extractions = []
+    remote_path = localization['remote_path']
+    recursive = '**' in localization['source_path']
     for language, base_path in localization['target_langs'].items():
         if not is_dir(base_path):
             logger.warning(
                 "source_path returns multiple files but target_langs[{0}] "
                 "is not a directory".format(base_path)
             )
-            return
-
-        for zip_name in translations.namelist():
-            if zip_name.endswith('/'):
-                # don't care about folders, they will be created with
-                # os.makedirs later
-                continue
-            base_dir, file_name = os.path.split(zip_name)
-            base_dir = "{0}/".format(base_dir)
-            zip_path = '{0}/{1}'.format(language, localization['remote_path'])
-            # is in remote path declaration and
-            if base_dir == zip_path:
-                try:
-                    translated = translations.read(zip_name)
-                except KeyError:
-                    logger.info("No {0} translation found".format(language))
-                    continue
-                try:
-                    os.makedirs(base_path)
-                except OSError:
-                    pass
-                target_file = "{0}{1}".format(base_path, file_name)
-                logger.info("Writing {0}".format(target_file))
-                with open(target_file, 'wb') as f:
-                    f.write(translated)
+            return extractions
 
+        remote_dirs = [remote_path]
+        if recursive:
+            remote_dirs = sorted(
+                remote_dir for lang, remote_dir in index
+                if lang == language and remote_dir.startswith(remote_path)
+            )
+        if not [True for remote_dir in remote_dirs
+                if (language, remote_dir) in index]:
+            logger.info("No {0} translation found".format(language))
+            continue
 
-def pull(conf):
-    api = API(project_name=conf['project_name'], api_key=conf['api_key'])
+        for remote_dir in remote_dirs:
+            target_dir = base_path + remote_dir[len(remote_path):]
+            try:
+                os.makedirs(target_dir)
+            except OSError:
+                pass
+
+            for zip_name, file_name in index.get((language, remote_dir), []):
+                target_file = "{0}{1}".format(target_dir, file_name)
+                extractions.append(Extraction(zip_name, target_file))
+    return extractions
+
+
+def same_content(path, chunks):
+    """
+    Returns True if the file has exactly the content of the ``chunks``.
+    """
+    with open(path, 'rb') as f:
+        for chunk in chunks:
+            if f.read(len(chunk)) != chunk:
+                return False
+        return not f.read(1)
+
+
+def write_if_changed(path, chunks, size=None):
+    """
+    Writes the content returned by ``chunks()``, an iterable of bytes, to
+    ``path`` unless the file already has this content. The content is only
+    compared when the file has the expected ``size``, if given.
+
+    The file is written to a temporary file which is then renamed, so readers
+    never see a partially written file. Returns True if the file was written.
+    """
+    if os.path.exists(path) and \
+            (size is None or os.path.getsize(path) == size) and \
+            same_content(path, chunks()):
+        return False
+    tmp_path = '{0}.crowdin-tmp'.format(path)
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks():
+                f.write(chunk)
+        replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+def extract_one(translations, item, metrics=None):
+    """
+    Performs an extraction, returns an ``(extraction, written)`` tuple.
+    """
+    start = time.time()
+    written = write_if_changed(
+        item.target, lambda: translations.chunks(item.zip_name),
+        size=translations.size(item.zip_name)
+    )
+    if metrics is not None:
+        metrics.record_file(item.target, time.time() - start,
+                            'write' if written else 'skip')
+    if written:
+        logger.info("Writing {0}".format(item.target))
+    else:
+        logger.debug("{0} is up to date".format(item.target))
+    return item, written
+
+
+def extract(translations, extractions, jobs=1, metrics=None, journal=None):
+    """
+    Extracts the translations using a pool of ``jobs`` threads. Returns a
+    list of ``(extraction, written)`` tuples, written being False for the
+    files which were already up to date.
+    """
+    def write(item):
+        result = extract_one(translations, item, metrics=metrics)
+        if journal is not None:
+            journal.record('pull', *item)
+        return result
+
+    if jobs > 1 and len(extractions) > 1:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(min(jobs, len(extractions)))
+        try:
+            return pool.map(write, extractions)
+        finally:
+            pool.close()
+            pool.join()
+    return [write(item) for item in extractions]
 
-    api.export()
 
-    translations = api.translations()
+def prepare_pull(api, conf, translations):
+    """
+    Returns the list of extractions needed by the localizations.
+    """
+    index = index_translations(translations)
 
+    extractions = []
     for localization in conf['localizations']:
         if '*' in localization['source_path']:
-            pull_dir(api, localization, translations)
+            extractions.extend(
+                pull_dir(api, localization, translations, index))
         else:
-            pull_file(api, localization, translations)
+            extractions.extend(pull_file(api, localization, translations))
+    return extractions
+
+
+def report_pull(results):
+    written = len([item for item, written in results if written])
+    logger.info("{0} files written, {1} unchanged".format(
+        written, len(results) - written
+    ))
+    return results
+
+
+def last_activity(info):
+    """
+    Returns the date of the last activity on the project.
+    """
+    return info.data.get('details', {}).get('last_activity')
+
+
+def should_export(api, state=None, max_age=None, reuse=False):
+    """
+    Returns whether the translations must be exported, and the last activity
+    on the project if ``reuse`` is True.
+
+    The last export recorded in ``state`` is reused if it's less than
+    ``max_age`` seconds old or, if ``reuse`` is True, if nothing happened on
+    the project since then. The project information is only fetched when
+    the age of the last export doesn't decide.
+    """
+    last_export = state.export if state is not None else None
+    if last_export:
+        age = time.time() - last_export['time']
+        if max_age is not None and age < max_age:
+            logger.info(
+                "Skipping export: last export is {0:.0f}s old, less than "
+                "{1}s".format(age, max_age)
+            )
+            return False, None
+
+    activity = None
+    if reuse:
+        activity = last_activity(api.info())
+
+    if not last_export:
+        logger.info("Exporting translations: no previous export recorded")
+        return True, activity
+
+    if reuse and activity is not None and \
+            activity == last_export.get('last_activity'):
+        logger.info(
+            "Skipping export: no activity on the project since the last "
+            "export ({0})".format(activity)
+        )
+        return False, activity
+
+    logger.info("Exporting translations: last export is {0:.0f}s old".format(
+        age
+    ))
+    return True, activity
+
+
+class Archives(object):
+    """
+    Several translation archives, seen as a single one.
+    """
+
+    def __init__(self, archives):
+        self.archives = {}
+        for archive in archives:
+            for name in archive.namelist():
+                self.archives[name] = archive
+
+    def namelist(self):
+        return list(self.archives)
+
+    def getinfo(self, name):
+        return self.archives[name].getinfo(name)
+
+    def read(self, name):
+        return self.archives[name].read(name)
+
+    def size(self, name):
+        return self.archives[name].size(name)
+
+    def chunks(self, name):
+        return self.archives[name].chunks(name)
+
+    def close(self):
+        for archive in set(self.archives.values()):
+            archive.close()
+
+
+class RemoteFiles(object):
+    """
+    Translated files downloaded one by one, with the same interface as a
+    translations archive for single file localizations.
+    """
+
+    def __init__(self, api, info):
+        self.api = api
+        self.info = info
+        self.contents = {}
+
+    def namelist(self):
+        return []
+
+    def getinfo(self, name):
+        """
+        Downloads the file, raises KeyError if it isn't translated in the
+        language, like a missing archive entry.
+        """
+        language, _, path = name.partition('/')
+        if path not in self.info:
+            raise KeyError(name)
+        try:
+            self.read(name)
+        except CrowdinException as ex:
+            if ex.status != 404:
+                raise
+            raise KeyError(name)
+        return name
+
+    def read(self, name):
+        # downloaded once, read again when compared to the local file
+        if name not in self.contents:
+            language, _, path = name.partition('/')
+            self.contents[name] = self.api.export_file(path, language)
+        return self.contents[name]
+
+    def size(self, name):
+        return len(self.read(name))
+
+    def chunks(self, name):
+        return [self.read(name)]
+
+    def close(self):
+        self.contents.clear()
+
+
+def language_archives(api, languages, cache=None):
+    """
+    Returns the translations archives of the ``languages`` found remotely.
+    """
+    archives = []
+    for language in languages:
+        try:
+            archives.append(api.translations(cache=cache, language=language))
+        except CrowdinException as ex:
+            if ex.status != 404:
+                raise
+            logger.info("No {0} translation found".format(language))
+    return archives
+
+
+def select_localizations(conf, languages=None, only=None):
+    """
+    Returns the localizations whose remote path matches the ``only`` glob,
+    restricted to the given ``languages``.
+    """
+    localizations = []
+    for localization in conf['localizations']:
+        if only is not None and \
+                not fnmatch.fnmatch(localization['remote_path'], only):
+            continue
+        if languages is not None:
+            localization = dict(localization, target_langs=dict(
+                (language, path)
+                for language, path in localization['target_langs'].items()
+                if language in languages
+            ))
+        localizations.append(localization)
+    return localizations
+
+
+def download_plan(localizations, languages=None, max_file_requests=10):
+    """
+    Returns how the translations should be downloaded: ``'files'`` to
+    download the files one by one, a list of languages to download an
+    archive per language, or ``'all'`` for the archive of all the languages.
+
+    Files are downloaded one by one when only a few single file
+    localizations are needed, archives per language when only some
+    languages are needed.
+    """
+    if not [True for localization in localizations
+            if '*' in localization['source_path']]:
+        file_requests = sum(len(localization['target_langs'])
+                            for localization in localizations)
+        if file_requests <= max_file_requests:
+            return 'files'
+    if languages is not None:
+        return sorted(set(
+            language for localization in localizations
+            for language in localization['target_langs']
+        ))
+    return 'all'
+
+
+def pull_plan(conf, languages=None, only=None):
+    """
+    Returns the ``PullPlan`` of a pull, without performing it.
+    """
+    conf = dict(conf, localizations=select_localizations(
+        conf, languages=languages, only=only
+    ))
+    info = ProjectTree({})
+    if conf['localizations']:
+        with API(project_name=conf['project_name'],
+                 api_key=conf['api_key']) as api:
+            info = api.info()
+    return plan_pull(conf, info)
+
+
+def pull(conf, jobs=1, state=None, export_max_age=None, reuse_export=False,
+         cache=None, metrics=None, languages=None, only=None, journal=None,
+         session=None, slots=None, limiter=None):
+    """
+    Pulls the translations from crowdin, the archive entries are extracted
+    by ``jobs`` parallel workers. Returns the list of ``(extraction,
+    written)``.
+
+    Only the ``languages`` and the localizations whose remote path matches
+    the ``only`` glob are pulled if given, see ``download_plan``.
+
+    See ``should_export`` for the ``export_max_age`` and ``reuse_export``
+    arguments, the archives are kept in the ``cache`` ``DownloadCache`` if
+    given. Measurements are recorded in ``metrics``.
+
+    The export and the extractions already recorded in the ``journal`` are
+    skipped, it is removed once the pull finished.
+
+    A ``session``, ``slots`` semaphore and ``RateLimiter`` shared with other
+    pushes or pulls may be given, see ``API``.
+    """
+    if metrics is None:
+        metrics = Metrics()
+    finished = False
+    try:
+        results = pull_translations(
+            conf, jobs=jobs, state=state, export_max_age=export_max_age,
+            reuse_export=reuse_export, cache=cache, metrics=metrics,
+            languages=languages, only=only, journal=journal,
+            session=session, slots=slots, limiter=limiter
+        )
+        finished = True
+    finally:
+        if journal is not None:
+            journal.close(finished=finished)
+    return results
+
+
+def pull_translations(conf, jobs, state, export_max_age, reuse_export, cache,
+                      metrics, languages, only, journal, session, slots,
+                      limiter):
+    plan = 'all'
+    if languages is not None or only is not None:
+        conf = dict(conf, localizations=select_localizations(
+            conf, languages=languages, only=only
+        ))
+        plan = download_plan(conf['localizations'], languages=languages)
+
+    with API(project_name=conf['project_name'], api_key=conf['api_key'],
+             pool_size=jobs, metrics=metrics,
+             rate_limits=conf.get('rate_limits'), limiter=limiter,
+             session=session, slots=slots) as api:
+        if plan == 'files':
+            logger.info("Downloading the translated files one by one")
+            with metrics.phase('info'):
+                translations = RemoteFiles(api, api.info())
+        else:
+            with metrics.phase('export'):
+                if journal is not None and ('export',) in journal:
+                    logger.info("Export already done by the previous run")
+                    export = False
+                else:
+                    export, activity = should_export(
+                        api, state, max_age=export_max_age,
+                        reuse=reuse_export
+                    )
+                if export:
+                    api.export()
+                    if state is not None:
+                        state.record_export(activity)
+                        state.save()
+                    if journal is not None:
+                        journal.record('export')
+            from .archive import ArchiveReader
+            with metrics.phase('download'):
+                if plan == 'all':
+                    translations = ArchiveReader(
+                        api.translations(cache=cache)
+                    )
+                else:
+                    translations = Archives([
+                        ArchiveReader(archive) for archive in
+                        language_archives(api, plan, cache=cache)
+                    ])
+        try:
+            with metrics.phase('prepare'):
+                extractions = prepare_pull(api, conf, translations)
+                if journal is not None:
+                    extractions = skip_completed(extractions, journal,
+                                                 'pull')
+
+            with metrics.phase('extract'):
+                results = extract(translations, extractions, jobs=jobs,
+                                  metrics=metrics, journal=journal)
+        finally:
+            translations.close()
+    return report_pull(results)
@@ -0,0 +1,135 @@
+"""
+Local file discovery: directory listings are read once and shared by all the
+localizations, glob patterns support recursive ``**`` components.
+"""
+import fnmatch
+import os
+import re
+
+try:
+    from os import scandir
+except ImportError:
+    # Python < 3.5
+    scandir = None
+
+
+MAGIC = re.compile(r'[*?[]')
+
+
+def translate(pattern):
+    """
+    Returns a regular expression matching the ``/`` separated paths matched by
+    a glob ``pattern``. ``**`` matches any number of directories.
+    """
+    result = []
+    index = 0
+    while index < len(pattern):
+        if pattern.startswith('**/', index):
+            result.append('(?:.*/)?')
+            index += 3
+        elif pattern.startswith('**', index):
+            result.append('.*')
+            index += 2
+        elif pattern[index] == '*':
+            result.append('[^/]*')
+            index += 1
+        elif pattern[index] == '?':
+            result.append('[^/]')
+            index += 1
+        elif pattern[index] == '[' and ']' in pattern[index + 2:]:
+            end = pattern.index(']', index + 2)
+            content = pattern[index + 1:end]
+            if content.startswith('!'):
+                content = '^' + content[1:]
+            result.append('[{0}]'.format(content.replace('\\', '\\\\')))
+            index = end + 1
+        else:
+            result.append(re.escape(pattern[index]))
+            index += 1
+    return re.compile('{0}$'.format(''.join(result)))
+
+
+def exclusion_regex(excluded):
+    """
+    Returns a single regular expression matching any of the comma separated
+    ``excluded`` patterns, or None.
+    """
+    patterns = [p.strip() for p in (excluded or '').split(',') if p.strip()]
+    if not patterns:
+        return None
+    return re.compile('|'.join(
+        '(?:{0})'.format(fnmatch.translate(p)) for p in patterns
+    ))
+
+
+class DirectoryCache(object):
+    """
+    Listings of local directories, each directory is read at most once.
+    """
+
+    def __init__(self):
+        self.listings = {}
+
+    def listdir(self, path):
+        """
+        Returns a dict of the entries of a directory to whether they are
+        directories, empty if the directory doesn't exist.
+        """
+        path = os.path.normpath(path)
+        if path not in self.listings:
+            entries = {}
+            try:
+                if scandir is not None:
+                    for entry in scandir(path):
+                        entries[entry.name] = entry.is_dir()
+                else:
+                    for name in os.listdir(path):
+                        entries[name] = os.path.isdir(os.path.join(path, name))
+            except OSError:
+                pass
+            self.listings[path] = entries
+        return self.listings[path]
+
+    def exists(self, path):
+        directory, name = os.path.split(path)
+        return name in self.listdir(directory or os.curdir)
+
+    def walk(self, top, depth=None):
+        """
+        Yields the ``/`` separated paths of the files under ``top``, relative
+        to it, down to ``depth`` subdirectories. Hidden entries are skipped.
+        """
+        for name, is_dir in sorted(self.listdir(top).items()):
+            if name.startswith('.'):
+                continue
+            if not is_dir:
+                yield name
+            elif depth is None or depth > 0:
+                for path in self.walk(os.path.join(top, name),
+                                      None if depth is None else depth - 1):
+                    yield '{0}/{1}'.format(name, path)
+
+    def glob(self, pattern):
+        """
+        Returns the ``(path, relative path)`` of the files matching a glob
+        pattern. With ``**``, the relative path starts at the first component
+        of the pattern containing a wildcard, otherwise it is the file name.
+        """
+        parts = pattern.replace(os.sep, '/').split('/')
+        for index, part in enumerate(parts):
+            if MAGIC.search(part):
+                break
+        else:
+            return [(pattern, os.path.basename(pattern))] \
+                if self.exists(pattern) else []
+
+        base = '/'.join(parts[:index]) or os.curdir
+        relative = '/'.join(parts[index:])
+        recursive = '**' in relative
+        depth = None if recursive else relative.count('/')
+        regex = translate(relative)
+        return [
+            (os.path.join(base, *path.split('/')) if parts[:index] else path,
+             path if recursive else path.rpartition('/')[2])
+            for path in self.walk(base, depth) if regex.match(path)
+        ]
@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+import threading
+import time
+
+
+logger = logging.getLogger('crowdin')
+
+
+class Journal(object):
+    """
+    Append-only log of the operations completed by a push or a pull, one JSON
+    list per line, so an interrupted run can be resumed. An operation may
+    come with a dict of data, stored as the last item of its list.
+
+    Records are flushed and synced to disk in batches, every ``sync_every``
+    records or ``sync_interval`` seconds.
+    """
+
+    def __init__(self, path, sync_every=100, sync_interval=1.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.completed = {}
+        self.file = None
+        self.pending = 0
+        self.last_sync = time.time()
+        self.lock = threading.Lock()
+
+    def open(self, resume=False):
+        """
+        Opens the journal, keeping the operations already recorded if
+        ``resume`` is True.
+        """
+        complete = True
+        if resume and os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                for line in f:
+                    complete = line.endswith('\n')
+                    try:
+                        operation = json.loads(line)
+                    except ValueError:
+                        # partial line of an interrupted run
+                        continue
+                    data = None
+                    if operation and isinstance(operation[-1], dict):
+                        data = operation.pop()
+                    self.completed[tuple(operation)] = data
+            logger.info("Resuming, {0} operations already completed".format(
+                len(self.completed)
+            ))
+        self.file = open(self.path, 'a' if resume else 'w')
+        if not complete:
+            # new records must not be appended to the partial line
+            self.file.write('\n')
+        return self
+
+    def __contains__(self, operation):
+        return tuple(operation) in self.completed
+
+    def get(self, operation):
+        """
+        Returns the data recorded with a completed operation, or None.
+        """
+        return self.completed.get(tuple(operation))
+
+    def record(self, *operation, **data):
+        with self.lock:
+            self.completed[operation] = data or None
+            self.file.write('{0}\n'.format(json.dumps(
+                list(operation) + [data] if data else operation
+            )))
+            self.pending += 1
+            if self.pending >= self.sync_every or \
+                    time.time() - self.last_sync >= self.sync_interval:
+                self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_sync = time.time()
+
+    def close(self, finished=False):
+        """
+        Closes the journal, and removes it if the run ``finished``: there is
+        nothing left to resume.
+        """
+        with self.lock:
+            self.sync()
+            self.file.close()
+        if finished:
+            os.remove(self.path)
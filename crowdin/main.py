@@ -1,16 +1,16 @@
-import json
-import logging
-import os
+"""
+Command line entry point. Only the modules needed by the requested command
+are imported, ``crowdin --version`` doesn't load ``requests``.
+"""
 import sys
 
-from optparse import OptionParser
-
 from . import __version__
-from .client import push, pull
 
 
-def main():
-    parser = OptionParser(usage='Usage: %prog [options] push|pull')
+def create_parser():
+    from optparse import OptionParser
+
+    parser = OptionParser(usage='Usage: %prog [options] push|pull|watch')
     parser.add_option('-v', '--version', dest="version", action="store_true",
                       help="Show the version number and exit")
     parser.add_option('-d', '--debug', dest="debug", action="store_true",
@@ -19,16 +19,110 @@ def main():
         '-a', '--all', dest="include_source", action="store_true",
         help="Push all translation, not just the source translation."
     )
-    options, args = parser.parse_args()
+    parser.add_option(
+        '-f', '--force', dest="force", action="store_true",
+        help="Push all files, even the ones unchanged since the last push."
+    )
+    parser.add_option(
+        '--trust-cache', dest="trust_cache", action="store_true",
+        help="Push: use the project information saved by the previous push "
+             "instead of fetching it."
+    )
+    parser.add_option(
+        '--export-max-age', dest="export_max_age", type="int",
+        metavar="SECONDS",
+        help="Pull: don't export the translations if the last export is "
+             "more recent."
+    )
+    parser.add_option(
+        '--reuse-export', dest="reuse_export", action="store_true",
+        help="Pull: don't export the translations if nothing happened on "
+             "the project since the last export."
+    )
+    parser.add_option(
+        '--no-cache', dest="no_cache", action="store_true",
+        help="Pull: don't use the cached translations archive."
+    )
+    parser.add_option(
+        '-l', '--lang', dest="languages", metavar="LANGUAGES",
+        help="Pull: only pull these comma separated languages."
+    )
+    parser.add_option(
+        '--only', dest="only", metavar="GLOB",
+        help="Pull: only pull the localizations whose remote_path matches "
+             "GLOB."
+    )
+    parser.add_option(
+        '-n', '--dry-run', dest="dry_run", action="store_true",
+        help="Print what would be pushed or pulled, without doing it."
+    )
+    parser.add_option(
+        '--resume', dest="resume", action="store_true",
+        help="Skip the operations completed by an interrupted push or pull."
+    )
+    parser.add_option(
+        '--config-glob', dest="config_glob", metavar="PATTERN",
+        help="Push or pull the projects of all the configuration files "
+             "matching PATTERN, e.g. 'services/*/.crowdin'."
+    )
+    parser.add_option(
+        '-j', '--jobs', dest="jobs", type="int", default=1,
+        help="Number of parallel uploads or extractions (default: 1)"
+    )
+    parser.add_option(
+        '-b', '--batch-size', dest="batch_size", type="int", default=1,
+        help="Push: maximum number of files uploaded per request "
+             "(default: 1)"
+    )
+    parser.add_option(
+        '--batch-bytes', dest="batch_bytes", type="int", metavar="BYTES",
+        help="Push: maximum size of the files uploaded in a single request, "
+             "larger files are sent alone (default: 10MB)"
+    )
+    parser.add_option(
+        '--debounce', dest="debounce", type="float", default=1.0,
+        metavar="SECONDS",
+        help="Watch: push once no file changed for SECONDS (default: 1)"
+    )
+    parser.add_option(
+        '--poll', dest="poll", action="store_true",
+        help="Watch: poll the files instead of using inotify."
+    )
+    parser.add_option(
+        '--profile', dest="profile", action="store_true",
+        help="Print a timing report at the end of the run."
+    )
+    parser.add_option(
+        '--profile-json', dest="profile_json", metavar="FILE",
+        help="Write the timing report to FILE as JSON."
+    )
+    return parser
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    # answered before loading optparse
+    if argv in (['-v'], ['--version']):
+        sys.stdout.write("crowdin-client %s\n" % __version__)
+        return
+
+    parser = create_parser()
+    options, args = parser.parse_args(argv)
 
     if options.version:
         sys.stdout.write("crowdin-client %s\n" % __version__)
         return
 
-    if not args or len(args) != 1 or args[0] not in ('push', 'pull'):
+    if not args or len(args) != 1 or \
+            args[0] not in ('push', 'pull', 'watch'):
         parser.print_help()
         return
 
+    import json
+    import logging
+    import os
+
     if options.debug:
         level = logging.DEBUG
         formatter = logging.Formatter('%(levelname)s: %(message)s')
@@ -44,13 +138,129 @@ def main():
     logger.addHandler(console)
 
     action = args[0]
+    languages = options.languages.split(',') if options.languages else None
+
+    if options.config_glob:
+        if action == 'watch':
+            parser.error("--config-glob can't be used with watch")
+        main_projects(action, options, languages)
+        return
+
+    from .client import pull, pull_plan, push, push_plan
+    from .metrics import Metrics
+    from .state import State
 
     config_file = os.path.join(os.path.abspath(os.getcwd()), '.crowdin')
     with open(config_file, 'r') as f:
         conf = json.loads(f.read())
+    state = State('{0}.state'.format(config_file))
+    metrics = Metrics()
+
+    if action == 'watch':
+        from .watch import create_watcher, watch
+        try:
+            watch(conf, include_source=options.include_source,
+                  jobs=options.jobs, state=state,
+                  batch_size=options.batch_size,
+                  batch_bytes=options.batch_bytes, debounce=options.debounce,
+                  watcher=create_watcher(poll=options.poll))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if options.dry_run:
+        if action == 'push':
+            plan = push_plan(conf, include_source=options.include_source,
+                             state=state, force=options.force)
+        else:
+            plan = pull_plan(conf, languages=languages, only=options.only)
+        sys.stdout.write("{0}\n".format(plan.describe()))
+        return
+
+    from .cache import DownloadCache, ProjectSnapshot
+    from .journal import Journal
 
+    journal = Journal('{0}.{1}.journal'.format(config_file, action))
+    journal.open(resume=options.resume)
+
+    failed = None
     if action == 'push':
-        push(conf, include_source=options.include_source)
+        failed = push(conf, include_source=options.include_source,
+                      jobs=options.jobs, state=state, force=options.force,
+                      batch_size=options.batch_size,
+                      batch_bytes=options.batch_bytes, metrics=metrics,
+                      journal=journal,
+                      snapshot=ProjectSnapshot(
+                          '{0}.snapshot'.format(config_file)
+                      ), trust_cache=options.trust_cache)
 
     elif action == 'pull':
-        pull(conf)
+        pull(conf, jobs=options.jobs, state=state,
+             export_max_age=options.export_max_age,
+             reuse_export=options.reuse_export,
+             cache=None if options.no_cache else DownloadCache(),
+             metrics=metrics, only=options.only, languages=languages,
+             journal=journal)
+
+    if options.profile:
+        sys.stderr.write("{0}\n".format(metrics.summary()))
+    if options.profile_json:
+        metrics.dump(options.profile_json)
+    if failed:
+        sys.exit(1)
+
+
+def main_projects(action, options, languages):
+    """
+    Pushes or pulls the projects of the configuration files matching
+    ``--config-glob`` and prints a combined report.
+    """
+    from .cache import DownloadCache
+    from .client import pull_plan, push_plan
+    from .metrics import Metrics
+    from .projects import find_configs, load_config, report, run_projects
+    from .state import State
+
+    configs = find_configs(options.config_glob)
+    if not configs:
+        sys.stderr.write("No configuration file matches {0}\n".format(
+            options.config_glob
+        ))
+        sys.exit(1)
+
+    if options.dry_run:
+        for config in configs:
+            conf = load_config(config)
+            state = State('{0}.state'.format(config))
+            if action == 'push':
+                plan = push_plan(conf, include_source=options.include_source,
+                                 state=state, force=options.force)
+            else:
+                plan = pull_plan(conf, languages=languages,
+                                 only=options.only)
+            sys.stdout.write("{0}:\n{1}\n".format(config, plan.describe()))
+        return
+
+    if action == 'push':
+        kwargs = dict(include_source=options.include_source,
+                      force=options.force, batch_size=options.batch_size,
+                      batch_bytes=options.batch_bytes,
+                      trust_cache=options.trust_cache)
+    else:
+        kwargs = dict(export_max_age=options.export_max_age,
+                      reuse_export=options.reuse_export,
+                      cache=None if options.no_cache else DownloadCache(),
+                      only=options.only, languages=languages)
+    results = run_projects(action, configs, jobs=options.jobs,
+                           resume=options.resume, **kwargs)
+    sys.stdout.write("{0}\n".format(report(results)))
+
+    metrics = Metrics()
+    for result in results:
+        metrics.merge(result.metrics)
+    if options.profile:
+        sys.stderr.write("{0}\n".format(metrics.summary()))
+    if options.profile_json:
+        metrics.dump(options.profile_json)
+    if any(result.error is not None or result.failed for result in results):
+        sys.exit(1)
@@ -0,0 +1,148 @@
+import json
+import threading
+import time
+
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def percentile(values, percent):
+    """
+    Nearest-rank percentile of a list of values.
+    """
+    if not values:
+        return 0
+    values = sorted(values)
+    index = int(round(percent / 100.0 * len(values) + 0.5)) - 1
+    return values[max(0, min(index, len(values) - 1))]
+
+
+class Metrics(object):
+    """
+    Performance measurements of a push or a pull: API calls (latency,
+    transferred bytes, retries), files and phases wall time.
+
+    Every measurement is also sent as a dict to the ``sinks`` callables, so it
+    can be forwarded to a metrics system. Sinks may be called from several
+    threads.
+    """
+
+    def __init__(self, sinks=None):
+        self.sinks = list(sinks or [])
+        self.calls = []
+        self.files = []
+        self.phases = OrderedDict()
+        self.lock = threading.Lock()
+
+    def emit(self, event):
+        for sink in self.sinks:
+            sink(event)
+
+    def record_call(self, endpoint, seconds, sent=0, received=0, retries=0,
+                    status=None):
+        event = {
+            'type': 'call',
+            'endpoint': endpoint,
+            'seconds': seconds,
+            'sent': sent,
+            'received': received,
+            'retries': retries,
+            'status': status,
+        }
+        with self.lock:
+            self.calls.append(event)
+        self.emit(event)
+
+    def record_file(self, path, seconds, action):
+        event = {
+            'type': 'file',
+            'path': path,
+            'seconds': seconds,
+            'action': action,
+        }
+        with self.lock:
+            self.files.append(event)
+        self.emit(event)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.time()
+        try:
+            yield
+        finally:
+            seconds = time.time() - start
+            with self.lock:
+                self.phases[name] = self.phases.get(name, 0) + seconds
+            self.emit({'type': 'phase', 'name': name, 'seconds': seconds})
+
+    def merge(self, other):
+        """
+        Adds the measurements of another ``Metrics``.
+        """
+        with self.lock:
+            self.calls.extend(other.calls)
+            self.files.extend(other.files)
+            for name, seconds in other.phases.items():
+                self.phases[name] = self.phases.get(name, 0) + seconds
+
+    def endpoints(self):
+        """
+        Returns the API calls statistics, by endpoint.
+        """
+        endpoints = OrderedDict()
+        for call in self.calls:
+            endpoints.setdefault(call['endpoint'], []).append(call)
+        stats = OrderedDict()
+        for endpoint, calls in endpoints.items():
+            latencies = [call['seconds'] for call in calls]
+            stats[endpoint] = {
+                'calls': len(calls),
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'sent': sum(call['sent'] for call in calls),
+                'received': sum(call['received'] for call in calls),
+                'retries': sum(call['retries'] for call in calls),
+            }
+        return stats
+
+    def slowest_files(self, count=10):
+        return sorted(self.files, key=lambda f: f['seconds'],
+                      reverse=True)[:count]
+
+    def as_dict(self):
+        return {
+            'phases': self.phases,
+            'endpoints': self.endpoints(),
+            'slowest_files': self.slowest_files(),
+        }
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            f.write(json.dumps(self.as_dict(), indent=1))
+
+    def summary(self):
+        """
+        Returns a human readable report of the measurements.
+        """
+        lines = ['Phases:']
+        for name, seconds in self.phases.items():
+            lines.append('  {0:<20} {1:>9.3f}s'.format(name, seconds))
+
+        lines.append('Endpoints:')
+        lines.append('  {0:<20} {1:>6} {2:>9} {3:>9} {4:>11} {5:>11} '
+                     '{6:>7}'.format('endpoint', 'calls', 'p50', 'p95',
+                                     'sent', 'received', 'retries'))
+        for endpoint, stats in self.endpoints().items():
+            lines.append(
+                '  {0:<20} {calls:>6} {p50:>8.3f}s {p95:>8.3f}s {sent:>11} '
+                '{received:>11} {retries:>7}'.format(endpoint, **stats)
+            )
+
+        files = self.slowest_files()
+        if files:
+            lines.append('Slowest files:')
+            for f in files:
+                lines.append('  {seconds:>9.3f}s {action:<8} {path}'.format(
+                    **f
+                ))
+        return '\n'.join(lines)
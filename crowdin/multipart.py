@@ -0,0 +1,84 @@
+import mimetypes
+import os
+import uuid
+
+
+class MultipartStream(object):
+    """
+    A ``multipart/form-data`` request body, read from the files in binary mode
+    in chunks, so uploading a file doesn't load it in memory.
+
+    ``files`` is a list of ``(field name, local path)``.
+    """
+
+    def __init__(self, files, chunk_size=64 * 1024):
+        self.files = dict(files)
+        self.chunk_size = chunk_size
+        self.boundary = uuid.uuid4().hex
+        self.parts = []
+        for name, path in files:
+            content_type = mimetypes.guess_type(path)[0] or \
+                'application/octet-stream'
+            header = (
+                '--{0}\r\n'
+                'Content-Disposition: form-data; name="{1}"; '
+                'filename="{2}"\r\n'
+                'Content-Type: {3}\r\n\r\n'
+            ).format(self.boundary, name, os.path.basename(path),
+                     content_type).encode('utf-8')
+            self.parts.append((header, path))
+        self.footer = '--{0}--\r\n'.format(self.boundary).encode('utf-8')
+        self.length = sum(len(header) + os.path.getsize(path) + 2
+                          for header, path in self.parts) + len(self.footer)
+        self._chunks = None
+        self._buffer = b''
+        self._position = 0
+
+    @property
+    def content_type(self):
+        return 'multipart/form-data; boundary={0}'.format(self.boundary)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for header, path in self.parts:
+            yield header
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                    yield chunk
+            yield b'\r\n'
+        yield self.footer
+
+    def read(self, size=-1):
+        """
+        File-like interface, for HTTP clients sending file objects.
+        """
+        if self._chunks is None:
+            self._chunks = iter(self)
+        if size is None or size < 0:
+            data = self._buffer + b''.join(self._chunks)
+            self._buffer = b''
+        else:
+            while len(self._buffer) < size:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._buffer += chunk
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        self._position += len(data)
+        return data
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        """
+        Only rewinding is supported, so the body can be sent again when a
+        request is retried.
+        """
+        if offset != 0 or whence != os.SEEK_SET:
+            raise IOError("MultipartStream can only be rewound")
+        self._chunks = None
+        self._buffer = b''
+        self._position = 0
@@ -0,0 +1,253 @@
+"""
+Planning of the push and pull operations, computed from the configuration
+and a snapshot of the project without performing any request.
+"""
+import logging
+import os
+
+from collections import namedtuple
+
+from .files import DirectoryCache, exclusion_regex
+
+
+logger = logging.getLogger('crowdin')
+
+
+Upload = namedtuple('Upload', 'local remote lang')
+Download = namedtuple('Download', 'language remote target')
+
+
+def is_dir(name):
+    return name[-1] == '/'
+
+
+class PushPlan(object):
+    """
+    The operations of a push: remote directories to create (parents first),
+    source files to add or update, translations to upload, and the uploads
+    skipped because the files didn't change.
+    """
+
+    def __init__(self, info):
+        self.info = info
+        self.mkdirs = []
+        self.adds = []
+        self.updates = []
+        self.translations = []
+        self.skips = []
+        self.planned = set()
+
+    def exists(self, path):
+        return path in self.info or path in self.planned
+
+    def mkdir(self, remote_path):
+        """
+        Plans the creation of the missing parent directories of
+        ``remote_path``.
+        """
+        dirs = remote_path.split('/')[:-1]
+        for index in range(len(dirs)):
+            name = "/".join(dirs[:index + 1])
+            if not self.exists(name):
+                self.mkdirs.append(name)
+                self.planned.add(name)
+
+    def put(self, local, remote, lang=None):
+        item = Upload(local, remote, lang)
+        if lang is not None:
+            self.translations.append(item)
+        elif self.exists(remote):
+            self.updates.append(item)
+        else:
+            self.adds.append(item)
+            self.planned.add(remote)
+
+    @property
+    def uploads(self):
+        return self.adds + self.updates + self.translations
+
+    def is_unchanged(self, item, state):
+        """
+        Returns True if the upload can be skipped according to ``state``.
+        Files missing remotely are always uploaded, their last push is
+        forgotten.
+        """
+        if item.remote not in self.info:
+            state.forget(*item)
+            return False
+        return state.is_unchanged(*item)
+
+    def skip_unchanged(self, state):
+        """
+        Moves the updates and translations of the files unchanged since their
+        last push to ``skips``.
+        """
+        for item in self.adds:
+            state.forget(*item)
+        for name in ('updates', 'translations'):
+            uploads = []
+            for item in getattr(self, name):
+                if self.is_unchanged(item, state):
+                    self.skips.append(item)
+                else:
+                    uploads.append(item)
+            setattr(self, name, uploads)
+
+    def describe(self):
+        lines = ['mkdir      {0}'.format(name) for name in self.mkdirs]
+        lines.extend('add        {0} -> {1}'.format(item.local, item.remote)
+                     for item in self.adds)
+        lines.extend('update     {0} -> {1}'.format(item.local, item.remote)
+                     for item in self.updates)
+        lines.extend('upload {0:<3} {1} -> {2}'.format(
+            item.lang, item.local, item.remote
+        ) for item in self.translations)
+        lines.extend('skip       {0}'.format(item.local)
+                     for item in self.skips)
+        lines.append(
+            '{0} directories, {1} added, {2} updated, {3} translations, '
+            '{4} skipped'.format(len(self.mkdirs), len(self.adds),
+                                 len(self.updates), len(self.translations),
+                                 len(self.skips))
+        )
+        return '\n'.join(lines)
+
+
+def push_dir(plan, localization, include_source, files):
+    """
+    Plans the push of a directory localization. ``source_path`` may contain
+    ``**`` to match files in subdirectories, which are pushed to the same
+    subdirectories of ``remote_path``.
+    """
+    remote_path = localization['remote_path']
+    if not is_dir(remote_path):
+        logger.warning(
+            "source_path returns multiple files but remote_path[{0}] "
+            "is not a directory".format(remote_path)
+        )
+        return
+
+    plan.mkdir(remote_path)
+
+    excluded = exclusion_regex(localization.get('excluded'))
+    for source_file, file_name in files.glob(localization['source_path']):
+        if excluded and (excluded.match(file_name.rpartition('/')[2]) or
+                         excluded.match(file_name)):
+            continue
+        remote_file = remote_path + file_name
+        plan.mkdir(remote_file)
+
+        # Upload reference translations
+        plan.put(source_file, remote_file)
+
+        if not include_source:
+            continue
+
+        # Upload local translations
+        for lang, path in localization['target_langs'].items():
+
+            if not is_dir(path):
+                logger.warning(
+                    "source_path returns multiple files but target_langs[{0}] "
+                    "is not a directory".format(path)
+                )
+            lang_src_file = os.path.join(path, *file_name.split('/'))
+            if files.exists(lang_src_file):
+                plan.put(lang_src_file, remote_file, lang)
+            else:
+                logger.debug(
+                    "Non-existing local {0} translation, skipping".format(lang)
+                )
+
+
+def push_file(plan, localization, include_source, files):
+    """
+    Plans the push of a single file localization.
+    """
+    plan.mkdir(localization['remote_path'])
+
+    # Upload reference translations
+    plan.put(localization['source_path'], localization['remote_path'])
+
+    if not include_source:
+        return
+
+    # Upload local translations
+    for lang, path in localization['target_langs'].items():
+        if files.exists(path):
+            plan.put(path, localization['remote_path'], lang)
+        else:
+            logger.debug(
+                "Inexisting local {0} translation, skipping".format(lang)
+            )
+
+
+def plan_push(conf, info, include_source, state=None, force=False):
+    """
+    Returns the ``PushPlan`` of the localizations of ``conf``.
+
+    If a ``State`` is given, files unchanged since their last successful
+    push are skipped unless ``force`` is True.
+    """
+    plan = PushPlan(info)
+    files = DirectoryCache()
+    for localization in conf['localizations']:
+        if '*' in localization['source_path']:
+            push_dir(plan, localization, include_source, files)
+        else:
+            push_file(plan, localization, include_source, files)
+
+    if state is not None and not force:
+        plan.skip_unchanged(state)
+    return plan
+
+
+class PullPlan(object):
+    """
+    The files a pull would write, as far as the project snapshot tells.
+    """
+
+    def __init__(self):
+        self.downloads = []
+
+    def describe(self):
+        lines = ['pull   {0:<3} {1} -> {2}'.format(*item)
+                 for item in self.downloads]
+        lines.append('{0} files'.format(len(self.downloads)))
+        return '\n'.join(lines)
+
+
+def remote_files(info, remote_path, recursive=False):
+    """
+    Returns the names of the files of the ``remote_path`` directory, relative
+    to it, including the files of its subdirectories if ``recursive``.
+    """
+    if recursive:
+        return sorted(path[len(remote_path):]
+                      for path, node in info.nodes.items()
+                      if path.startswith(remote_path) and 'files' not in node)
+    node = info.nodes.get(remote_path.rstrip('/'), {})
+    return [child['name'] for child in node.get('files', [])
+            if 'files' not in child]
+
+
+def plan_pull(conf, info):
+    """
+    Returns the ``PullPlan`` of the localizations of ``conf``: the remote
+    files of the snapshot, in every target language.
+    """
+    plan = PullPlan()
+    for localization in conf['localizations']:
+        remote_path = localization['remote_path']
+        if '*' in localization['source_path']:
+            names = remote_files(info, remote_path,
+                                 recursive='**' in localization['source_path'])
+            for language, base_path in localization['target_langs'].items():
+                for name in names:
+                    plan.downloads.append(Download(
+                        language, remote_path + name, base_path + name
+                    ))
+        elif remote_path in info:
+            for language, path in localization['target_langs'].items():
+                plan.downloads.append(Download(language, remote_path, path))
+    return plan
@@ -0,0 +1,144 @@
+"""
+Several crowdin projects pushed or pulled in a single process, sharing the
+HTTP connections and a global limit of requests in progress.
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+from .api import API, CrowdinException, RateLimiter
+from .cache import ProjectSnapshot
+from .client import pull, push
+from .journal import Journal
+from .metrics import Metrics
+from .state import State
+
+
+logger = logging.getLogger('crowdin')
+
+
+ProjectResult = namedtuple('ProjectResult',
+                           'config seconds metrics failed error')
+
+
+def load_config(path):
+    """
+    Reads a ``.crowdin`` configuration file, its local paths being made
+    relative to the current directory instead of the file's directory.
+    """
+    with open(path, 'r') as f:
+        conf = json.loads(f.read())
+    base = os.path.relpath(os.path.dirname(os.path.abspath(path)))
+    if base != os.curdir:
+        for localization in conf['localizations']:
+            localization['source_path'] = os.path.join(
+                base, localization['source_path']
+            )
+            localization['target_langs'] = dict(
+                (lang, os.path.join(base, path))
+                for lang, path in localization['target_langs'].items()
+            )
+    return conf
+
+
+def find_configs(pattern):
+    return sorted(glob.glob(pattern))
+
+
+def shared_limiter(configs):
+    """
+    Returns the ``RateLimiter`` shared by the projects, limiting each
+    endpoint to its lowest rate in their configurations.
+    """
+    rates = {}
+    for config in configs:
+        try:
+            limits = load_config(config).get('rate_limits') or {}
+        except (IOError, ValueError):
+            # reported when the project runs
+            continue
+        for name, rate in limits.items():
+            rates[name] = min(rate, rates.get(name, rate))
+    return RateLimiter(rates)
+
+
+def run_project(action, config, session, slots, jobs=1, resume=False,
+                **options):
+    """
+    Pushes or pulls the project of a configuration file, returns a
+    ``ProjectResult``. Errors are reported instead of being raised.
+    """
+    metrics = Metrics()
+    start = time.time()
+    failed, error = [], None
+    try:
+        conf = load_config(config)
+        state = State('{0}.state'.format(config))
+        journal = Journal('{0}.{1}.journal'.format(config, action))
+        journal.open(resume=resume)
+        if action == 'push':
+            snapshot = ProjectSnapshot('{0}.snapshot'.format(config))
+            failed = push(conf, jobs=jobs, state=state, metrics=metrics,
+                          journal=journal, session=session, slots=slots,
+                          snapshot=snapshot, **options)
+        else:
+            pull(conf, jobs=jobs, state=state, metrics=metrics,
+                 journal=journal, session=session, slots=slots, **options)
+    except (CrowdinException, IOError, ValueError) as ex:
+        logger.error("{0} of {1} failed: {2}".format(action, config, ex))
+        error = ex
+    return ProjectResult(config, time.time() - start, metrics, failed, error)
+
+
+def run_projects(action, configs, jobs=1, resume=False, **options):
+    """
+    Pushes or pulls several projects concurrently. At most ``jobs`` requests
+    are in progress at the same time, over a shared connection pool, and a
+    throttling response slows all the projects down.
+
+    The other ``options`` are passed to ``push`` or ``pull``. Returns the
+    list of ``ProjectResult``.
+    """
+    session = API.connect(pool_size=jobs)
+    slots = threading.BoundedSemaphore(jobs)
+    limiter = shared_limiter(configs)
+
+    def run(config):
+        logger.info("Running {0} of {1}".format(action, config))
+        return run_project(action, config, session, slots, jobs=jobs,
+                           resume=resume, limiter=limiter, **options)
+
+    pool = ThreadPool(min(jobs, len(configs)) or 1)
+    try:
+        return pool.map(run, configs)
+    finally:
+        pool.close()
+        pool.join()
+        session.close()
+
+
+def report(results):
+    """
+    Returns a human readable report of the projects results.
+    """
+    lines = ['{0:<50} {1:>9} {2:>7} {3:>7} {4:>9}'.format(
+        'project', 'time', 'files', 'failed', 'requests'
+    )]
+    for result in results:
+        lines.append('{0:<50} {1:>8.2f}s {2:>7} {3:>7} {4:>9}{5}'.format(
+            result.config, result.seconds, len(result.metrics.files),
+            len(result.failed), len(result.metrics.calls),
+            '  error: {0}'.format(result.error) if result.error else ''
+        ))
+    errors = [result for result in results
+              if result.error is not None or result.failed]
+    lines.append('{0} projects, {1} with errors'.format(
+        len(results), len(errors)
+    ))
+    return '\n'.join(lines)
@@ -0,0 +1,48 @@
+"""
+HTTP sessions of the API. This module imports ``requests``, it is only loaded
+when the first request is made.
+"""
+import requests
+
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+
+class TransientRetry(Retry):
+    """
+    Doesn't retry the responses with a ``Retry-After`` header, they are
+    handled by the ``RateLimiter`` of the API.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if has_retry_after:
+            return False
+        return super(TransientRetry, self).is_retry(method, status_code,
+                                                    has_retry_after)
+
+
+def create_retry(retries, backoff, statuses):
+    """
+    Retries connection errors and the transient server error ``statuses``,
+    for every HTTP method, with an exponential backoff.
+    """
+    kwargs = dict(total=retries, backoff_factor=backoff,
+                  status_forcelist=statuses, raise_on_status=False)
+    try:
+        return TransientRetry(allowed_methods=False, **kwargs)
+    except TypeError:
+        # urllib3 < 1.26
+        return TransientRetry(method_whitelist=False, **kwargs)
+
+
+def connect(pool_size, retries, backoff, statuses):
+    """
+    Returns a new HTTP session, keeping up to ``pool_size`` connections
+    alive.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=pool_size,
+                          max_retries=create_retry(retries, backoff, statuses))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+
+logger = logging.getLogger('crowdin')
+
+# atomic rename, even when the target exists on Windows (Python 3.3+)
+replace = getattr(os, 'replace', os.rename)
+
+
+def file_hash(path, chunk_size=64 * 1024):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class State(object):
+    """
+    Local state of a crowdin project, stored as JSON next to the ``.crowdin``
+    configuration file.
+
+    Keeps track of the files that were successfully pushed, so unchanged
+    files are not uploaded again, and of the last export of the translations.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        self.export = None
+        self.pending = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                data = json.loads(f.read())
+            self.files = data.get('files', {})
+            self.export = data.get('export')
+
+    @staticmethod
+    def key(local, remote, lang=None):
+        return "{0}|{1}|{2}".format(local, remote, lang or '')
+
+    def is_unchanged(self, local, remote, lang=None):
+        """
+        Returns True if ``local`` didn't change since it was last pushed to
+        ``remote``. The file is only hashed if its size is unchanged but its
+        modification time is not.
+        """
+        entry = self.files.get(self.key(local, remote, lang))
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(local)
+        except OSError:
+            return False
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime == entry['mtime']:
+            return True
+        if file_hash(local) != entry['sha1']:
+            return False
+        # touched but not modified, no need to hash it next time
+        entry['mtime'] = stat.st_mtime
+        return True
+
+    def prepare(self, local, remote, lang=None):
+        """
+        Takes the size, modification time and hash of ``local`` before it is
+        pushed to ``remote``, to be recorded once the upload succeeded.
+        """
+        key = self.key(local, remote, lang)
+        try:
+            stat = os.stat(local)
+            self.pending[key] = {
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'sha1': file_hash(local),
+            }
+        except (IOError, OSError):
+            self.pending.pop(key, None)
+
+    def prepared(self, local, remote, lang=None):
+        """
+        Returns what ``prepare`` took of ``local``, or None.
+        """
+        return self.pending.get(self.key(local, remote, lang))
+
+    def record(self, local, remote, lang=None, entry=None):
+        """
+        Records that ``local`` was successfully pushed to ``remote``, as it
+        was when ``prepare`` was called or as described by ``entry``. Files
+        changed since are pushed again next time.
+        """
+        key = self.key(local, remote, lang)
+        entry = self.pending.pop(key, None) if entry is None else entry
+        if entry is None:
+            self.files.pop(key, None)
+        else:
+            self.files[key] = entry
+
+    def forget(self, local, remote, lang=None):
+        """
+        Forgets the last push of ``local`` to ``remote``.
+        """
+        self.files.pop(self.key(local, remote, lang), None)
+
+    def record_export(self, last_activity=None):
+        """
+        Records that the translations were just exported, while the last
+        activity on the project was ``last_activity``.
+        """
+        self.export = {'time': time.time(), 'last_activity': last_activity}
+
+    def save(self):
+        logger.debug("Saving state to {0}".format(self.path))
+        tmp_path = '{0}.tmp'.format(self.path)
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({'files': self.files, 'export': self.export},
+                               indent=1, sort_keys=True))
+        replace(tmp_path, self.path)
@@ -0,0 +1,287 @@
+"""
+Watch mode: the source files are watched, and pushed as soon as they change
+with the API session and the project information kept between pushes.
+"""
+import logging
+import os
+import time
+
+from .api import API, CrowdinException
+from .client import (make_dirs, prepare_push, refresh_info, report_push,
+                     upload)
+from .files import MAGIC, DirectoryCache, scandir
+from .plan import is_dir, plan_push
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+
+logger = logging.getLogger('crowdin')
+
+
+def watched_directories(conf, include_source):
+    """
+    Returns the local directories where the files of the localizations are
+    created or modified.
+    """
+    patterns = []
+    for localization in conf['localizations']:
+        source_path = localization['source_path']
+        patterns.append(source_path)
+        if include_source:
+            if '*' in source_path:
+                relative = source_path.replace(os.sep, '/').split('/')
+                while relative and not MAGIC.search(relative[0]):
+                    relative.pop(0)
+                patterns.extend(os.path.join(path, *relative)
+                                for path in localization['target_langs']
+                                .values() if is_dir(path))
+            else:
+                patterns.extend(localization['target_langs'].values())
+
+    files = DirectoryCache()
+    directories = set()
+    for pattern in patterns:
+        parts = pattern.replace(os.sep, '/').split('/')
+        for index, part in enumerate(parts):
+            if MAGIC.search(part):
+                break
+        else:
+            directories.add(os.path.abspath(os.path.dirname(pattern)))
+            continue
+        base = os.path.abspath('/'.join(parts[:index]) or os.curdir)
+        relative = '/'.join(parts[index:])
+        depth = None if '**' in relative else relative.count('/') - 1
+        directories.add(base)
+        if depth is None or depth >= 0:
+            directories.update(subdirectories(files, base, depth))
+    return directories
+
+
+def subdirectories(files, top, depth=None):
+    for name, is_directory in files.listdir(top).items():
+        if is_directory and not name.startswith('.'):
+            path = os.path.join(top, name)
+            yield path
+            if depth is None or depth > 0:
+                for subdirectory in subdirectories(
+                        files, path, None if depth is None else depth - 1):
+                    yield subdirectory
+
+
+class PollingWatcher(object):
+    """
+    Detects the changes by comparing the size and modification time of the
+    files of the watched directories every ``interval`` seconds.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.directories = set()
+        self.snapshot = {}
+
+    def watch(self, directories):
+        added = set(directories) - self.directories
+        self.directories.update(added)
+        self.snapshot.update(self.scan(added))
+
+    def scan(self, directories):
+        """
+        Returns the ``(modification time, size)`` of the files of
+        ``directories``, and None for their subdirectories.
+        """
+        files = {}
+        for directory in directories:
+            try:
+                if scandir is not None:
+                    for entry in scandir(directory):
+                        if entry.is_dir():
+                            files[entry.path] = None
+                        elif entry.is_file():
+                            stat = entry.stat()
+                            files[entry.path] = (stat.st_mtime, stat.st_size)
+                else:
+                    for name in os.listdir(directory):
+                        path = os.path.join(directory, name)
+                        if os.path.isdir(path):
+                            files[path] = None
+                        elif os.path.isfile(path):
+                            stat = os.stat(path)
+                            files[path] = (stat.st_mtime, stat.st_size)
+            except OSError:
+                pass
+        return files
+
+    def read(self, timeout):
+        """
+        Returns the paths of the files changed in the next ``timeout``
+        seconds, or ``interval`` seconds if it is shorter.
+        """
+        time.sleep(min(timeout, self.interval))
+        snapshot = self.scan(self.directories)
+        changed = set(path for path, stat in snapshot.items()
+                      if path not in self.snapshot or
+                      self.snapshot[path] != stat)
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(object):
+    """
+    Detects the changes with inotify, requires the ``inotify_simple`` package.
+    """
+
+    def __init__(self):
+        flags = inotify_simple.flags
+        self.mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE
+        self.inotify = inotify_simple.INotify()
+        self.watches = {}
+
+    def watch(self, directories):
+        watched = set(self.watches.values())
+        for directory in set(directories) - watched:
+            try:
+                self.watches[self.inotify.add_watch(directory,
+                                                    self.mask)] = directory
+            except OSError:
+                logger.debug("Can't watch {0}".format(directory))
+
+    def read(self, timeout):
+        """
+        Returns the paths of the files changed in the next ``timeout``
+        seconds, as soon as a change happens.
+        """
+        changed = set()
+        for event in self.inotify.read(timeout=int(timeout * 1000)):
+            if event.mask & inotify_simple.flags.IGNORED:
+                self.watches.pop(event.wd, None)
+            elif event.wd in self.watches and event.name:
+                changed.add(os.path.join(self.watches[event.wd], event.name))
+        return changed
+
+    def close(self):
+        self.inotify.close()
+
+
+def create_watcher(poll=False, interval=1.0):
+    """
+    Returns an ``InotifyWatcher`` if available, a ``PollingWatcher``
+    otherwise or if ``poll`` is True.
+    """
+    if not poll and inotify_simple is not None:
+        try:
+            return InotifyWatcher()
+        except OSError as ex:
+            logger.debug("inotify is not available: {0}".format(ex))
+    return PollingWatcher(interval)
+
+
+def wait_changes(watcher, debounce, max_delay):
+    """
+    Waits for changes, until ``debounce`` seconds passed without any other
+    change or ``max_delay`` seconds since the first one. Returns the changed
+    paths, empty if nothing changed in ``max_delay`` seconds.
+    """
+    changed = watcher.read(max_delay)
+    if not changed:
+        return changed
+    start = time.time()
+    while time.time() - start < max_delay:
+        more = watcher.read(debounce)
+        if not more:
+            break
+        changed.update(more)
+    return changed
+
+
+def expand(changed):
+    """
+    Replaces the new directories of ``changed`` by the files they contain.
+    """
+    files = set()
+    for path in changed:
+        if os.path.isdir(path):
+            for directory, dirnames, filenames in os.walk(path):
+                files.update(os.path.join(directory, name)
+                             for name in filenames)
+        else:
+            files.add(path)
+    return files
+
+
+def push_changes(api, conf, info, include_source, changed, state=None,
+                 jobs=1, batch_size=1, batch_bytes=None):
+    """
+    Pushes the ``changed`` local files, returns the failed ``(upload,
+    error)``.
+    """
+    plan = plan_push(conf, info, include_source)
+    uploads = [item for item in plan.uploads
+               if os.path.abspath(item.local) in changed]
+    if state is not None:
+        uploads = [item for item in uploads
+                   if not plan.is_unchanged(item, state)]
+    if not uploads:
+        return []
+    make_dirs(api, plan)
+    results = upload(api, uploads, info, jobs=jobs, batch_size=batch_size,
+                     state=state, batch_bytes=batch_bytes)
+    return report_push(results, state=state)
+
+
+def watch(conf, include_source, jobs=1, state=None, batch_size=1,
+          debounce=1.0, max_delay=10.0, watcher=None, stop=None,
+          batch_bytes=None):
+    """
+    Pushes the local files to crowdin, then pushes them again each time they
+    change until the ``stop`` event is set.
+
+    Bursts of changes are pushed together, once no file changed for
+    ``debounce`` seconds (or ``max_delay`` seconds after the first change).
+    Failed uploads are attempted again with the next changes, with the
+    project information fetched again if crowdin disagreed with it.
+    """
+    if watcher is None:
+        watcher = create_watcher()
+    logger.info("Watching the source files with {0}".format(
+        type(watcher).__name__
+    ))
+    with API(project_name=conf['project_name'], api_key=conf['api_key'],
+             pool_size=jobs, rate_limits=conf.get('rate_limits')) as api:
+        info = api.info()
+        watcher.watch(watched_directories(conf, include_source))
+        uploads = prepare_push(api, conf, info, include_source, state=state)
+        failed = report_push(upload(api, uploads, info, jobs=jobs,
+                                    batch_size=batch_size, state=state,
+                                    batch_bytes=batch_bytes), state=state)
+        pending = set(os.path.abspath(item.local) for item, error in failed)
+        try:
+            while stop is None or not stop.is_set():
+                if info.stale:
+                    info = refresh_info(api)
+                changed = wait_changes(watcher, debounce, max_delay)
+                if not changed:
+                    continue
+                if any(os.path.isdir(path) for path in changed):
+                    watcher.watch(watched_directories(conf, include_source))
+                    changed = expand(changed)
+                logger.info("{0} files changed".format(len(changed)))
+                pending.update(changed)
+                try:
+                    failed = push_changes(
+                        api, conf, info, include_source, pending,
+                        state=state, jobs=jobs, batch_size=batch_size,
+                        batch_bytes=batch_bytes
+                    )
+                except (CrowdinException, IOError) as ex:
+                    logger.error("Push failed: {0}".format(ex))
+                else:
+                    pending = set(os.path.abspath(item.local)
+                                  for item, error in failed)
+        finally:
+            watcher.close()
@@ -41,6 +41,9 @@ setup(
     ],
     zip_safe=False,
     install_requires=install_requires,
+    extras_require={
+        'inotify': ['inotify_simple'],
+    },
     scripts=[
         'scripts/crowdin',
     ],
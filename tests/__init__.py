@@ -2,7 +2,6 @@ import itertools
 import json
 import os
 import zipfile
-import StringIO
 from io import BytesIO as BaseBytesIO
 
 from requests import Response
@@ -28,14 +27,17 @@ class Patched(object):
         self.kwargs = kwargs
 
     def __call__(self, url, files=None, params=None, *args, **kwargs):
-        self.current_call = {
+        if files is None and hasattr(kwargs.get('data'), 'files'):
+            # streamed multipart upload
+            files = kwargs['data'].files
+        current_call = {
             'url': url,
             'files': files,
             'params': params,
             'type': url.split("/")[-1],
         }
-        result = self.do_call(url,  *args, **kwargs)
-        self.calls.append(self.current_call)
+        result = self.do_call(url, files=files, *args, **kwargs)
+        self.calls.append(current_call)
         return result
 
     def do_call(self, *args, **kwargs):
@@ -61,8 +63,16 @@ class Crowdin_GET(Patched):
             response.status_code = 200
             return response
         if url.endswith('/test-project/download/all.zip'):
+            etag = self.kwargs.get('etag')
+            if etag and kwargs.get('headers', {}).get('If-None-Match') == etag:
+                response = Response()
+                response.raw = BytesIO(b'')
+                response.status_code = 304
+                return response
             response = create_zip_response(self.kwargs.get('zip', {}))
             response.status_code = 200
+            if etag:
+                response.headers['ETag'] = etag
             return response
         else:
             assert NotImplementedError
@@ -70,8 +80,19 @@ class Crowdin_GET(Patched):
 
 class Crowdin_POST(Patched):
 
-    def do_call(self, url, **kwargs):
+    def do_call(self, url, files=None, **kwargs):
         response = Response()
+        failing = self.kwargs.get('fail', ())
+        if files and [True for name in files if name in failing]:
+            response.raw = BytesIO(
+                """<?xml version="1.0" encoding="ISO-8859-1"?>
+                    <error>
+                        <code>8</code>
+                        <message>File was not found</message>
+                    </error>
+                """.encode('utf-8'))
+            response.status_code = 404
+            return response
         response.raw = BytesIO(
             """<?xml version="1.0" encoding="ISO-8859-1"?>
                 <success>
@@ -83,12 +104,12 @@ class Crowdin_POST(Patched):
 
 def create_zip_response(zip_info):
     response = Response()
-    o = StringIO.StringIO()
+    o = BytesIO()
     zf = zipfile.ZipFile(o, mode='w')
     for entry_name, file_name in zip_info.items():
         f = os.path.join(os.path.abspath(test_path), file_name)
         zf.write(f, entry_name)
     zf.close()
     o.seek(0)
-    response._content = o.read()
+    response.raw = o
     return response
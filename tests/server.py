@@ -0,0 +1,242 @@
+"""
+A local HTTP stand-in for the crowdin API, keeping the project in memory.
+"""
+import io
+import json
+import re
+import threading
+import time
+import zipfile
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+
+
+SUCCESS = b'<?xml version="1.0" encoding="UTF-8"?><success/>'
+
+ERROR = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<error><code>{0}</code><message>{1}</message></error>'
+)
+
+
+def parse_multipart(body, content_type):
+    """
+    Returns the ``{field name: content}`` of a multipart/form-data body.
+    """
+    boundary = content_type.split('boundary=')[-1].encode('utf-8')
+    fields = {}
+    for part in body.split(b'--' + boundary)[1:-1]:
+        headers, _, content = part.partition(b'\r\n\r\n')
+        name = re.search(b'name="([^"]+)"', headers).group(1)
+        fields[name.decode('utf-8')] = content[:-2]
+    return fields
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeCrowdin(object):
+    """
+    Serves the info, add-directory, add-file, update-file,
+    upload-translation, export, download and export-file endpoints of a
+    single project.
+
+    Every request is delayed by ``latency`` seconds. ``requests`` counts the
+    requests by endpoint. The next ``throttle[endpoint]`` requests to an
+    endpoint are answered with a 429 status.
+    """
+
+    def __init__(self, project_name='test-project', languages=('fr',),
+                 latency=0):
+        self.project_name = project_name
+        self.languages = list(languages)
+        self.latency = latency
+        self.nodes = {}
+        self.sources = {}
+        self.translations = {}
+        self.archive = None
+        self.requests = {}
+        self.throttle = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+    def populate(self, files, content=b''):
+        """
+        Adds remote source files, and their parent directories.
+        """
+        for path in files:
+            dirs = path.split('/')[:-1]
+            for index in range(len(dirs)):
+                self.nodes['/'.join(dirs[:index + 1])] = 'directory'
+            self.nodes[path] = 'file'
+            self.sources[path] = content
+
+    @property
+    def root_url(self):
+        return 'http://127.0.0.1:{0}/api'.format(self.server.server_port)
+
+    def start(self):
+        handler = type('Handler', (Handler,), {'crowdin': self})
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def info(self):
+        root = {'files': []}
+        nodes = {'': root}
+        for path in sorted(self.nodes):
+            parent, _, name = path.rpartition('/')
+            node = {'name': name, 'node_type': self.nodes[path]}
+            if self.nodes[path] == 'directory':
+                node['files'] = []
+                nodes[path] = node
+            nodes[parent]['files'].append(node)
+        return root
+
+    def export(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for language in self.languages:
+                for path, content in sorted(self.sources.items()):
+                    zf.writestr('{0}/{1}'.format(language, path),
+                                self.translations.get((language, path),
+                                                      content))
+        self.archive = archive.getvalue()
+
+    def language_archive(self, language):
+        archive = io.BytesIO()
+        prefix = '{0}/'.format(language)
+        with zipfile.ZipFile(io.BytesIO(self.archive)) as exported, \
+                zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for name in exported.namelist():
+                if name.startswith(prefix):
+                    zf.writestr(name, exported.read(name))
+        return archive.getvalue()
+
+    def handle(self, method, endpoint, params, fields):
+        """
+        Returns the status, content type and body of a response.
+        """
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            if self.throttle.get(endpoint):
+                self.throttle[endpoint] -= 1
+                return self.error(429, 0, 'Too many requests')
+
+            if method == 'GET' and endpoint == 'info':
+                return 200, 'application/json', \
+                    json.dumps(self.info()).encode('utf-8')
+
+            if method == 'GET' and endpoint.startswith('download/'):
+                if self.archive is None:
+                    self.export()
+                language = endpoint[len('download/'):-len('.zip')]
+                if language == 'all':
+                    return 200, 'application/zip', self.archive
+                if language not in self.languages:
+                    return self.error(404, 0, 'Language not found')
+                return 200, 'application/zip', self.language_archive(language)
+
+            if method == 'GET' and endpoint == 'export-file':
+                path = params['file'][0]
+                language = params['language'][0]
+                if path not in self.sources or \
+                        language not in self.languages:
+                    return self.error(404, 8, 'File was not found')
+                return 200, 'application/octet-stream', \
+                    self.translations.get((language, path),
+                                          self.sources[path])
+
+            if method != 'POST':
+                return self.error(404, 0, 'Unknown endpoint')
+
+            if endpoint == 'export':
+                self.export()
+                return 200, 'text/xml', SUCCESS
+
+            if endpoint == 'add-directory':
+                name = params['name'][0]
+                parent = name.rpartition('/')[0]
+                if name in self.nodes or (parent and parent not in self.nodes):
+                    return self.error(400, 13, 'Directory not created')
+                self.nodes[name] = 'directory'
+                return 200, 'text/xml', SUCCESS
+
+            files = dict((name[len('files['):-1], content)
+                         for name, content in fields.items())
+            for path, content in files.items():
+                if endpoint == 'add-file':
+                    if path in self.nodes:
+                        return self.error(400, 5, 'File already exists')
+                    if path.rpartition('/')[0] not in self.nodes and \
+                            '/' in path:
+                        return self.error(400, 17, 'Directory not found')
+                elif path not in self.sources:
+                    return self.error(404, 8, 'File was not found')
+            for path, content in files.items():
+                if endpoint == 'upload-translation':
+                    self.translations[(params['language'][0], path)] = content
+                else:
+                    self.nodes[path] = 'file'
+                    self.sources[path] = content
+            return 200, 'text/xml', SUCCESS
+
+    def error(self, status, code, message):
+        return status, 'text/xml', ERROR.format(code, message).encode('utf-8')
+
+
+class Handler(BaseHTTPRequestHandler):
+    crowdin = None
+
+    def respond(self, method):
+        time.sleep(self.crowdin.latency)
+        url = urlparse(self.path)
+        prefix = '/api/project/{0}/'.format(self.crowdin.project_name)
+        endpoint = url.path[len(prefix):]
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        fields = {}
+        content_type = self.headers.get('Content-Type') or ''
+        if content_type.startswith('multipart/form-data'):
+            fields = parse_multipart(body, content_type)
+
+        status, content_type, content = self.crowdin.handle(
+            method, endpoint, parse_qs(url.query), fields
+        )
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self.respond('GET')
+
+    def do_POST(self):
+        self.respond('POST')
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,77 @@
+import json
+import mock
+import os
+import shutil
+import unittest
+
+try:
+    import asyncio
+    from crowdin import aio
+except (ImportError, SyntaxError):
+    # Python < 3.5
+    aio = None
+
+from tests import Crowdin_GET, Crowdin_POST
+from tests.test_client import PROJECT_INFO
+
+test_path = os.path.dirname(__file__)
+
+
+@unittest.skipIf(aio is None, "asyncio client requires Python 3.5+")
+class AsyncClientTest(unittest.TestCase):
+
+    def setUp(self):
+        os.chdir(test_path)
+        if os.path.exists("_data"):
+            shutil.rmtree("_data")
+
+    def run_async(self, coroutine):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        return loop.run_until_complete(coroutine)
+
+    @mock.patch("requests.Session.get")
+    @mock.patch("requests.Session.post")
+    def test_push(self, post, get):
+        mock_get = Crowdin_GET(get, info={'files': []})
+        mock_post = Crowdin_POST(post, fail=['files[main/multi/good.po]'])
+        with open('data/.crowdin.push.ok', 'r') as f:
+            conf = json.loads(f.read())
+
+        failed = self.run_async(aio.push(conf, include_source=False,
+                                         concurrency=4))
+
+        post_by_type = mock_post.call_by_type
+        self.assertEqual(len(mock_get.calls), 1)
+        self.assertEqual(len(post_by_type['add-directory']), 3)
+        self.assertEqual(len(post_by_type['add-file']), 3)
+        self.assertEqual([item.remote for item, error in failed],
+                         ['main/multi/good.po'])
+
+    @mock.patch("requests.Session.get")
+    @mock.patch("requests.Session.post")
+    def test_pull(self, post, get):
+        Crowdin_GET(get, info=PROJECT_INFO, zip={
+            'fr/main/simple/file.po': 'data/sample.po',
+            'fr/main/multi/good.po': 'data/sample.po',
+        })
+        mock_post = Crowdin_POST(post)
+        with open('data/.crowdin.pull.ok', 'r') as f:
+            conf = json.loads(f.read())
+
+        results = self.run_async(aio.pull(conf, concurrency=4))
+
+        self.assertEqual(len(mock_post.call_by_type['export']), 1)
+        self.assertEqual(len(results), 2)
+        self.assertTrue(os.path.exists("_data/locale/fr/simple/file.po"))
+        self.assertTrue(os.path.exists("_data/locale/fr/multi/good.po"))
+
+    def test_translations(self):
+        api = aio.AsyncAPI(project_name='test-project', api_key='key')
+        with mock.patch.object(api.api, 'translations',
+                               return_value='archive') as translations:
+            self.assertEqual(
+                self.run_async(api.translations(language='fr')), 'archive'
+            )
+        self.run_async(api.aclose())
+        translations.assert_called_once_with(cache=None, language='fr')
@@ -0,0 +1,226 @@
+import mock
+import requests
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from crowdin.api import (
+    API, CrowdinException, InvalidResponse, ProjectTree, RateLimiter,
+    ServerError, ThrottledError, check_success, retry_after, root_tag
+)
+from crowdin.cache import DownloadCache
+from crowdin.multipart import MultipartStream
+
+from tests import Crowdin_GET
+
+test_path = os.path.dirname(__file__)
+
+
+class SessionTest(unittest.TestCase):
+
+    def test_session_reused(self):
+        with API(project_name='test-project', api_key='test-api-key',
+                 pool_size=4, retries=2) as api:
+            session = api.session
+            self.assertIs(api.session, session)
+
+            adapter = session.get_adapter(api.root_url)
+            self.assertEqual(adapter._pool_maxsize, 4)
+            self.assertEqual(adapter.max_retries.total, 2)
+            self.assertIn(503, adapter.max_retries.status_forcelist)
+            # uploads are POST requests, they must be retried as well
+            self.assertTrue(adapter.max_retries.is_retry('POST', 502))
+            # throttling responses are left to the rate limiter
+            self.assertFalse(adapter.max_retries.is_retry('POST', 503, True))
+        self.assertIsNone(api._session)
+
+
+class ResponseTest(unittest.TestCase):
+
+    def response(self, status, content):
+        response = requests.Response()
+        response.status_code = status
+        response._content = content
+        return response
+
+    def test_success(self):
+        self.assertEqual(root_tag(b'<?xml version="1.0"?><success><a/>'),
+                         'success')
+        check_success(self.response(200, b'<success/>'))
+
+    def test_errors(self):
+        with self.assertRaises(CrowdinException) as context:
+            check_success(self.response(404, (
+                b'<?xml version="1.0" encoding="UTF-8"?><error><code>8</code>'
+                b'<message>File was not found</message></error>'
+            )))
+        ex = context.exception
+        self.assertEqual((ex.code, ex.status, ex.retriable), (8, 404, False))
+        self.assertEqual(str(ex), 'File was not found (code 8)')
+
+        with self.assertRaises(ServerError) as context:
+            check_success(self.response(502, b'<html><body>Bad Gateway'))
+        self.assertTrue(context.exception.retriable)
+        self.assertEqual(str(context.exception),
+                         'Unexpected response (HTTP 502)')
+
+        self.assertRaises(ThrottledError, check_success,
+                          self.response(429, b''))
+        self.assertRaises(InvalidResponse, check_success,
+                          self.response(200, b'<html>'))
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def test_retry_after(self):
+        response = mock.Mock(headers={'Retry-After': '3'})
+        self.assertEqual(retry_after(response), 3)
+        response.headers['Retry-After'] = 'Thu, 01 Jan 1970 00:01:00 GMT'
+        self.assertEqual(retry_after(response, now=50), 10)
+        self.assertIsNone(retry_after(mock.Mock(headers={})))
+
+    def test_limit(self):
+        limiter = RateLimiter({'add-file': 50}, burst=2)
+        for i in range(2):
+            self.assertEqual(limiter.acquire('add-file'), 0)
+        for i in range(3):
+            self.assertEqual(limiter.acquire('info'), 0)
+        self.assertGreater(limiter.acquire('add-file'), 0.01)
+        self.assertEqual(limiter.bucket('download/fr.zip').rate, None)
+
+    def test_throttle(self):
+        limiter = RateLimiter({'default': 8})
+        limiter.throttle('update-file', delay=2)
+        limiter.throttle('update-file')
+
+        self.assertEqual(limiter.bucket('update-file').rate, 2)
+        self.assertEqual(limiter.bucket('info').rate, 8)
+        # the pause applies to every endpoint
+        self.assertGreater(limiter.paused_until - time.time(), 1.5)
+
+        limiter.success('update-file')
+        self.assertEqual(limiter.bucket('update-file').rate, 2.25)
+
+
+class ProjectTreeTest(unittest.TestCase):
+
+    def test_lookup(self):
+        tree = ProjectTree({'files': [{
+            'name': 'main',
+            'node_type': 'directory',
+            'files': [{'name': 'file.po', 'node_type': 'file'}],
+        }]})
+        self.assertIn('main', tree)
+        self.assertIn('main/file.po', tree)
+        self.assertNotIn('file.po', tree)
+        self.assertNotIn('main/other.po', tree)
+
+    def test_add(self):
+        tree = ProjectTree({'files': []})
+        tree.add('main', 'directory')
+        tree.add('main/file.po', 'file')
+        self.assertIn('main/file.po', tree)
+        self.assertEqual(tree['files'][0]['files'][0]['name'], 'file.po')
+
+
+class BatchesTest(unittest.TestCase):
+
+    def test_split_on_size(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        uploads = []
+        for name, size in (('a.po', 40), ('b.po', 50), ('c.po', 20)):
+            path = os.path.join(root, name)
+            with open(path, 'wb') as f:
+                f.write(b'x' * size)
+            uploads.append((path, name, None))
+        info = ProjectTree({'files': []})
+        api = API(project_name='test-project', api_key='key')
+
+        batches = api.batches(uploads, info, max_files=10, max_bytes=100)
+        self.assertEqual([[item[1] for item in batch.uploads]
+                          for batch in batches], [['a.po', 'b.po'], ['c.po']])
+        self.assertEqual(len(api.batches(uploads, info, max_files=10)), 1)
+
+
+class TranslationsTest(unittest.TestCase):
+
+    @mock.patch("requests.Session.get")
+    def test_spooled_to_disk(self, get):
+        Crowdin_GET(get, zip={
+            'fr/main/simple/file.po': 'data/sample.po',
+            'fr/main/multi/good.po': 'data/sample.po',
+        })
+        with API(project_name='test-project', api_key='test-api-key') as api:
+            translations = api.translations(chunk_size=16, spool_size=64)
+        self.assertTrue(translations.fp._rolled)
+        self.assertEqual(sorted(translations.namelist()), [
+            'fr/main/multi/good.po', 'fr/main/simple/file.po',
+        ])
+        self.assertEqual(get.call_args[1]['stream'], True)
+
+    @mock.patch("requests.Session.get")
+    def test_cache(self, get):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        cache = DownloadCache(cache_dir)
+        mock_get = Crowdin_GET(get, etag='"v1"', zip={
+            'fr/main/simple/file.po': 'data/sample.po',
+        })
+        with API(project_name='test-project', api_key='test-api-key') as api:
+            translations = api.translations(cache=cache)
+            self.assertEqual(translations.filename,
+                             cache.path('test-project-all'))
+
+            translations = api.translations(cache=cache)
+            self.assertEqual(translations.namelist(),
+                             ['fr/main/simple/file.po'])
+        self.assertEqual(get.call_args[1]['headers'],
+                         {'If-None-Match': '"v1"'})
+        self.assertEqual(len(mock_get.calls), 2)
+
+
+class DownloadCacheTest(unittest.TestCase):
+
+    def test_evict(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        cache = DownloadCache(cache_dir, max_size=25)
+        for index, key in enumerate(('old', 'recent', 'new')):
+            with open(cache.path(key), 'wb') as f:
+                f.write(b'x' * 10)
+            os.utime(cache.path(key), (index, index))
+        cache.evict(keep=cache.path('new'))
+        self.assertEqual(sorted(os.listdir(cache_dir)),
+                         ['new.zip', 'recent.zip'])
+
+
+class MultipartStreamTest(unittest.TestCase):
+
+    def test_body(self):
+        path = os.path.join(test_path, 'data', 'sample.po')
+        with open(path, 'rb') as f:
+            content = f.read()
+        body = MultipartStream([('files[main/sample.po]', path)],
+                               chunk_size=7)
+
+        chunks = []
+        for chunk in iter(lambda: body.read(5), b''):
+            self.assertLessEqual(len(chunk), 5)
+            chunks.append(chunk)
+        data = b''.join(chunks)
+
+        self.assertEqual(len(data), len(body))
+        self.assertEqual(body.tell(), len(body))
+        self.assertIn(b'name="files[main/sample.po]"; filename="sample.po"',
+                      data)
+        # the file is sent as is
+        self.assertIn(b'\r\n\r\n' + content + b'\r\n', data)
+        self.assertTrue(data.endswith(
+            '--{0}--\r\n'.format(body.boundary).encode('utf-8')
+        ))
+
+        body.seek(0)
+        self.assertEqual(body.read(), data)
@@ -0,0 +1,75 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from crowdin.archive import ArchiveReader
+from crowdin.client import write_if_changed
+
+
+STORED = os.urandom(200 * 1024)
+DEFLATED = b'msgid "x"\nmsgstr "y"\n' * 50000
+
+
+class ArchiveReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.path = os.path.join(self.root, 'all.zip')
+        with zipfile.ZipFile(self.path, 'w') as archive:
+            archive.writestr(zipfile.ZipInfo('fr/stored.po'), STORED)
+            archive.writestr('fr/deflated.po', DEFLATED,
+                             zipfile.ZIP_DEFLATED)
+
+    def check_chunks(self, reader, name, content):
+        chunks = list(reader.chunks(name))
+        self.assertEqual(b''.join(bytes(chunk) for chunk in chunks), content)
+        self.assertTrue(all(len(chunk) <= 1024 for chunk in chunks))
+        self.assertEqual(reader.size(name), len(content))
+
+    def test_mapped(self):
+        reader = ArchiveReader(zipfile.ZipFile(self.path), chunk_size=1024)
+        self.addCleanup(reader.close)
+        self.assertIsNotNone(reader.map)
+        self.check_chunks(reader, 'fr/stored.po', STORED)
+        self.check_chunks(reader, 'fr/deflated.po', DEFLATED)
+        # stored members are not copied
+        self.assertIsInstance(next(reader.chunks('fr/stored.po')),
+                              memoryview)
+
+    def test_in_memory(self):
+        with open(self.path, 'rb') as f:
+            reader = ArchiveReader(zipfile.ZipFile(io.BytesIO(f.read())),
+                                   chunk_size=1024)
+        self.assertIsNone(reader.map)
+        self.check_chunks(reader, 'fr/stored.po', STORED)
+        self.check_chunks(reader, 'fr/deflated.po', DEFLATED)
+
+    def test_bad_crc(self):
+        with open(self.path, 'r+b') as f:
+            data = f.read()
+            f.seek(data.index(STORED[:16]) + 100)
+            f.write(b'x')
+        reader = ArchiveReader(zipfile.ZipFile(self.path))
+        self.addCleanup(reader.close)
+        self.assertRaises(zipfile.BadZipfile, list,
+                          reader.chunks('fr/stored.po'))
+
+    def test_write_if_changed(self):
+        reader = ArchiveReader(zipfile.ZipFile(self.path), chunk_size=1024)
+        self.addCleanup(reader.close)
+        target = os.path.join(self.root, 'deflated.po')
+
+        def chunks():
+            return reader.chunks('fr/deflated.po')
+
+        self.assertTrue(write_if_changed(target, chunks, len(DEFLATED)))
+        self.assertFalse(write_if_changed(target, chunks, len(DEFLATED)))
+        with open(target, 'wb') as f:
+            f.write(DEFLATED[:-1] + b'!')
+        self.assertTrue(write_if_changed(target, chunks, len(DEFLATED)))
+        with open(target, 'rb') as f:
+            self.assertEqual(f.read(), DEFLATED)
@@ -4,14 +4,40 @@ import mock
 import os
 import unittest
 import shutil
+import tempfile
 
 
-from crowdin.client import push, pull
+from crowdin.api import API, CrowdinException, ServerError
+from crowdin.cache import ProjectSnapshot
+from crowdin.client import index_translations, push, pull
+from crowdin.journal import Journal
+from crowdin.metrics import Metrics
+from crowdin.state import State
 
 from tests import Crowdin_GET, Crowdin_POST
+from tests.server import FakeCrowdin
 
 test_path = os.path.dirname(__file__)
 
+PROJECT_INFO = {
+    'files': [{
+        'name': 'main',
+        'files': [{
+            'name': 'simple',
+            'files': [{
+                'name': 'file.po'
+            }]
+        }, {
+            'name': 'multi',
+            'files': [{
+                'name': 'good.po'
+            }, {
+                'name': 'good2.po'
+            }]
+        }]
+    }]
+}
+
 
 class APITest(unittest.TestCase):
 
@@ -22,8 +48,8 @@ class APITest(unittest.TestCase):
         if os.path.exists("_data"):
             shutil.rmtree("_data")
 
-    @mock.patch("requests.get")
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.get")
+    @mock.patch("requests.Session.post")
     def test_push_ok(self, post, get):
         os.chdir(test_path)
         mock_get = Crowdin_GET(get, info={
@@ -70,8 +96,8 @@ class APITest(unittest.TestCase):
         # Should only ask 'info' once.
         self.assertEqual(len(mock_get.calls), 1)
 
-    @mock.patch("requests.get")
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.get")
+    @mock.patch("requests.Session.post")
     def test_push_create_dir(self, post, get):
         os.chdir(test_path)
         mock_get = Crowdin_GET(get, info={
@@ -87,13 +113,11 @@ class APITest(unittest.TestCase):
         post_by_type = mock_post.call_by_type
         get_by_type = mock_get.call_by_type
 
-        # info called 3 times ( initial / upload single / upload multi )
-        self.assertEqual(len(get_by_type['info']), 3)
+        # info called once, created directories are added to it
+        self.assertEqual(len(get_by_type['info']), 1)
 
         # Should have created 3 directory using 'add-directory'
-        # create dir main is called twice, because /info does
-        # not return the previously created dir ( test only )
-        self.assertEqual(len(post_by_type['add-directory']), 4)
+        self.assertEqual(len(post_by_type['add-directory']), 3)
         added_dir = [x['params']['name']
                      for x in post_by_type['add-directory']]
         self.assertIn('main', added_dir)
@@ -109,8 +133,139 @@ class APITest(unittest.TestCase):
         self.assertIn('files[main/multi/good.po]', files)
         self.assertIn('files[main/multi/good2.po]', files)
 
-    @mock.patch("requests.get")
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.get")
+    @mock.patch("requests.Session.post")
+    def test_push_parallel(self, post, get):
+        os.chdir(test_path)
+        Crowdin_GET(get, info=PROJECT_INFO)
+        mock_post = Crowdin_POST(post, fail=['files[main/multi/good.po]'])
+        config_file = 'data/.crowdin.push.ok'
+        with open(config_file, 'r') as f:
+            conf = json.loads(f.read())
+
+        failed = push(conf, include_source=True, jobs=4)
+
+        # The failing upload doesn't prevent the other ones, "file not found"
+        # means the project changed: it's retried once with fresh information
+        self.assertEqual(len(mock_post.call_by_type['update-file']), 4)
+        self.assertEqual(len(get.call_args_list), 2)
+        self.assertEqual(len(failed), 1)
+        upload, error = failed[0]
+        self.assertEqual(upload.remote, 'main/multi/good.po')
+        self.assertIsInstance(error, CrowdinException)
+
+    @mock.patch("requests.Session.get")
+    @mock.patch("requests.Session.post")
+    def test_push_skips_unchanged(self, post, get):
+        os.chdir(test_path)
+        Crowdin_GET(get, info=PROJECT_INFO)
+        mock_post = Crowdin_POST(post)
+        config_file = 'data/.crowdin.push.ok'
+        with open(config_file, 'r') as f:
+            conf = json.loads(f.read())
+        state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir)
+        state_file = os.path.join(state_dir, '.crowdin.state')
+
+        push(conf, include_source=False, state=State(state_file))
+        self.assertEqual(len(mock_post.calls), 3)
+
+        # Nothing changed, nothing is uploaded
+        push(conf, include_source=False, state=State(state_file))
+        self.assertEqual(len(mock_post.calls), 3)
+
+        # Touched but identical files are not uploaded either
+        os.utime('data/locale/en/simple/file.po', None)
+        push(conf, include_source=False, state=State(state_file))
+        self.assertEqual(len(mock_post.calls), 3)
+
+        push(conf, include_source=False, state=State(state_file),
+             force=True)
+        self.assertEqual(len(mock_post.calls), 6)
+
+    @mock.patch("requests.Session.get")
+    @mock.patch("requests.Session.post")
+    def test_push_batch(self, post, get):
+        os.chdir(test_path)
+        Crowdin_GET(get, info={'files': [{
+            'name': 'main',
+            'files': [{'name': 'simple', 'files': []}, {
+                'name': 'multi',
+                'files': [{'name': 'good.po'}, {'name': 'good2.po'}],
+            }],
+        }]})
+        mock_post = Crowdin_POST(post)
+        config_file = 'data/.crowdin.push.ok'
+        with open(config_file, 'r') as f:
+            conf = json.loads(f.read())
+
+        failed = push(conf, include_source=True, batch_size=10)
+
+        self.assertEqual(failed, [])
+        post_by_type = mock_post.call_by_type
+        self.assertEqual(len(post_by_type['add-file']), 1)
+        self.assertEqual(len(post_by_type['update-file']), 1)
+        self.assertEqual(sorted(post_by_type['update-file'][0]['files']), [
+            'files[main/multi/good.po]', 'files[main/multi/good2.po]',
+        ])
+
+        # Errors are attributed to the right file
+        mock_post = Crowdin_POST(post, fail=['files[main/multi/good.po]'])
+        failed = push(conf, include_source=True, batch_size=10)
+        self.assertEqual([item.remote for item, error in failed],
+                         ['main/multi/good.po'])
+        # batch, one by one, retry with fresh project information
+        self.assertEqual(len(mock_post.call_by_type['update-file']), 4)
+
+    @mock.patch("requests.Session.get")
+    @mock.patch("requests.Session.post")
+    def test_push_retriable(self, post, get):
+        os.chdir(test_path)
+        Crowdin_GET(get, info=PROJECT_INFO)
+        mock_post = Crowdin_POST(post)
+        with open('data/.crowdin.push.ok', 'r') as f:
+            conf = json.loads(f.read())
+        errors = [ServerError('Unexpected response (HTTP 502)', status=502)]
+        post_files = API.post_files
+
+        def failing_post_files(api, *args):
+            if errors:
+                raise errors.pop()
+            return post_files(api, *args)
+
+        with mock.patch.object(API, 'post_files', failing_post_files):
+            failed = push(conf, include_source=True, batch_size=10)
+
+        self.assertEqual(failed, [])
+        # the failed batch is not split, it is sent again at the end
+        self.assertEqual(len(mock_post.call_by_type['update-file']), 1)
+
+    @mock.patch("requests.Session.get")
+    @mock.patch("requests.Session.post")
+    def test_push_metrics(self, post, get):
+        os.chdir(test_path)
+        Crowdin_GET(get, info=PROJECT_INFO)
+        Crowdin_POST(post)
+        config_file = 'data/.crowdin.push.ok'
+        with open(config_file, 'r') as f:
+            conf = json.loads(f.read())
+        events = []
+        metrics = Metrics(sinks=[events.append])
+
+        push(conf, include_source=False, metrics=metrics)
+
+        self.assertEqual(list(metrics.phases),
+                         ['info', 'prepare', 'upload'])
+        endpoints = metrics.endpoints()
+        self.assertEqual(endpoints['info']['calls'], 1)
+        self.assertEqual(endpoints['update-file']['calls'], 3)
+        self.assertGreater(endpoints['update-file']['sent'], 0)
+        self.assertEqual(len(metrics.slowest_files()), 3)
+        self.assertEqual(len([e for e in events if e['type'] == 'call']), 4)
+        self.assertIn('update-file', metrics.summary())
+
+    @mock.patch("requests.Session.get")
+    @mock.patch("requests.Session.post")
     def test_pull_ok(self, post, get):
         os.chdir(test_path)
         mock_get = Crowdin_GET(get, info={
@@ -159,3 +314,345 @@ class APITest(unittest.TestCase):
 
         # Should only ask 'download/all.zip' once.
         self.assertEqual(len(mock_get.calls), 1)
+
+    @mock.patch("requests.Session.get")
+    @mock.patch("requests.Session.post")
+    def test_pull_unchanged(self, post, get):
+        os.chdir(test_path)
+        zip_info = {
+            'en/main/simple/file.po': 'data/sample.po',
+            'fr/main/simple/file.po': 'data/sample.po',
+            'fr/main/multi/good.po': 'data/sample.po',
+            'fr/main/multi/good2.po': 'data/sample.po',
+        }
+        Crowdin_GET(get, info=PROJECT_INFO, zip=zip_info)
+        Crowdin_POST(post)
+        config_file = 'data/.crowdin.pull.ok'
+        with open(config_file, 'r') as f:
+            conf = json.loads(f.read())
+
+        results = pull(conf, jobs=2)
+        self.assertEqual([written for item, written in results],
+                         [True] * 4)
+
+        os.utime('_data/locale/fr/multi/good.po', (0, 0))
+        with open('_data/locale/fr/multi/good2.po', 'a') as f:
+            f.write('# local change\n')
+
+        Crowdin_GET(get, info=PROJECT_INFO, zip=zip_info)
+        results = dict(pull(conf, jobs=2))
+        written = [item.target for item, w in results.items() if w]
+        self.assertEqual(written, ['_data/locale/fr/multi/good2.po'])
+        # unchanged files are not touched
+        self.assertEqual(os.path.getmtime('_data/locale/fr/multi/good.po'),
+                         0)
+        self.assertEqual(sorted(os.listdir('_data/locale/fr/multi')),
+                         ['good.po', 'good2.po'])
+
+    @mock.patch("requests.Session.get")
+    @mock.patch("requests.Session.post")
+    def test_pull_reuse_export(self, post, get):
+        os.chdir(test_path)
+        info = dict(PROJECT_INFO, details={
+            'last_activity': '2013-06-01 10:00:00',
+        })
+        zip_info = {'fr/main/simple/file.po': 'data/sample.po'}
+        mock_get = Crowdin_GET(get, info=info, zip=zip_info)
+        mock_post = Crowdin_POST(post)
+        config_file = 'data/.crowdin.pull.ok'
+        with open(config_file, 'r') as f:
+            conf = json.loads(f.read())
+        state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir)
+        state_file = os.path.join(state_dir, '.crowdin.state')
+
+        pull(conf, state=State(state_file), reuse_export=True)
+        self.assertEqual(len(mock_post.calls), 1)
+
+        # No activity since the last export
+        pull(conf, state=State(state_file), reuse_export=True)
+        self.assertEqual(len(mock_post.calls), 1)
+
+        # Recent export, the activity is not even fetched
+        info['details']['last_activity'] = '2013-06-01 11:00:00'
+        info_calls = len(mock_get.call_by_type['info'])
+        pull(conf, state=State(state_file), reuse_export=True,
+             export_max_age=3600)
+        self.assertEqual(len(mock_post.calls), 1)
+        self.assertEqual(len(mock_get.call_by_type['info']), info_calls)
+
+        pull(conf, state=State(state_file), reuse_export=True)
+        self.assertEqual(len(mock_post.calls), 2)
+        self.assertEqual(State(state_file).export['last_activity'],
+                         '2013-06-01 11:00:00')
+
+
+class IndexTest(unittest.TestCase):
+
+    def test_index_translations(self):
+        translations = mock.Mock()
+        translations.namelist.return_value = [
+            'fr/', 'fr/main/', 'fr/main/multi/',
+            'fr/main/multi/good.po', 'fr/main/multi/good2.po',
+            'de/main/multi/good.po', 'fr/main/simple/file.po',
+        ]
+        index = index_translations(translations)
+        self.assertEqual(index[('fr', 'main/multi/')], [
+            ('fr/main/multi/good.po', 'good.po'),
+            ('fr/main/multi/good2.po', 'good2.po'),
+        ])
+        self.assertEqual(index[('de', 'main/multi/')], [
+            ('de/main/multi/good.po', 'good.po'),
+        ])
+        self.assertEqual(len(index), 3)
+
+
+class FakeServerTest(unittest.TestCase):
+
+    def setUp(self):
+        os.chdir(test_path)
+        if os.path.exists("_data"):
+            shutil.rmtree("_data")
+        self.server = FakeCrowdin(languages=['fr']).start()
+        self.addCleanup(self.server.stop)
+        patcher = mock.patch.object(API, 'root_url', self.server.root_url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_push_pull(self):
+        with open('data/.crowdin.push.ok', 'r') as f:
+            conf = json.loads(f.read())
+
+        failed = push(conf, include_source=False, jobs=2, batch_size=2)
+
+        self.assertEqual(failed, [])
+        self.assertEqual(self.server.requests['info'], 1)
+        self.assertEqual(self.server.requests['add-directory'], 3)
+        self.assertEqual(self.server.requests['add-file'], 2)
+        with open('data/locale/en/multi/good.po', 'rb') as f:
+            self.assertEqual(self.server.sources['main/multi/good.po'],
+                             f.read())
+
+        with open('data/.crowdin.pull.ok', 'r') as f:
+            conf = json.loads(f.read())
+        results = pull(conf, jobs=2)
+
+        self.assertEqual(len(results), 3)
+        with open('_data/locale/fr/multi/good2.po', 'rb') as f:
+            self.assertEqual(self.server.sources['main/multi/good2.po'],
+                             f.read())
+
+    def test_partial_pull(self):
+        self.server.languages = ['fr', 'de']
+        self.server.populate(['main/simple/file.po', 'main/multi/good.po'],
+                             content=b'msgid ""\n')
+        with open('data/.crowdin.pull.ok', 'r') as f:
+            conf = json.loads(f.read())
+        conf['localizations'][0]['target_langs']['de'] = \
+            '_data/locale/de/simple/file.po'
+
+        results = pull(conf, languages=['de'], only='main/simple/*')
+
+        self.assertEqual([item.target for item, written in results],
+                         ['_data/locale/de/simple/file.po'])
+        self.assertEqual(self.server.requests['export-file'], 1)
+        self.assertNotIn('export', self.server.requests)
+
+        # changed locally, downloaded once to be compared and written
+        with open('_data/locale/de/simple/file.po', 'wb') as f:
+            f.write(b'msgid "x"\n')
+        results = pull(conf, languages=['de'], only='main/simple/*')
+        self.assertEqual([written for item, written in results], [True])
+        self.assertEqual(self.server.requests['export-file'], 2)
+
+        results = pull(conf, languages=['fr'])
+
+        self.assertEqual(sorted(item.target for item, written in results), [
+            '_data/locale/fr/multi/good.po', '_data/locale/fr/simple/file.po'
+        ])
+        self.assertEqual(self.server.requests['download/fr.zip'], 1)
+        self.assertNotIn('download/all.zip', self.server.requests)
+        self.assertFalse(os.path.exists('_data/locale/de/multi'))
+
+    def test_push_batch_bytes(self):
+        with open('data/.crowdin.push.ok', 'r') as f:
+            conf = json.loads(f.read())
+
+        failed = push(conf, include_source=False, batch_size=10,
+                      batch_bytes=20)
+
+        self.assertEqual(failed, [])
+        # simple/file.po is larger than the limit, it is sent alone
+        self.assertEqual(self.server.requests['add-file'], 2)
+
+        push(conf, include_source=False, batch_size=10)
+        self.assertEqual(self.server.requests['update-file'], 1)
+
+    def test_push_batch_missing_file(self):
+        with open('data/.crowdin.push.ok', 'r') as f:
+            conf = json.loads(f.read())
+        conf['localizations'].append({
+            'source_path': 'data/missing.po',
+            'remote_path': 'main/missing.po',
+            'target_langs': {},
+        })
+
+        failed = push(conf, include_source=False, batch_size=2)
+
+        self.assertEqual([item.local for item, error in failed],
+                         ['data/missing.po'])
+        self.assertIn('main/multi/good.po', self.server.sources)
+
+    def test_push_pull_wildcard_directory(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        for path in ('src/app1/m.po', 'src/app2/n.po'):
+            path = os.path.join(root, *path.split('/'))
+            os.makedirs(os.path.dirname(path))
+            with open(path, 'wb') as f:
+                f.write(b'msgid ""\n')
+        conf = {
+            'project_name': 'test-project',
+            'api_key': 'key',
+            'localizations': [{
+                'source_path': os.path.join(root, 'src', '*', '*.po'),
+                'remote_path': 'r/',
+                'target_langs': {'fr': os.path.join(root, 'fr', '')},
+            }],
+        }
+
+        self.assertEqual(push(conf, include_source=False), [])
+        self.assertEqual(sorted(self.server.sources), ['r/m.po', 'r/n.po'])
+
+        results = pull(conf)
+        self.assertEqual(sorted(item.target for item, written in results), [
+            os.path.join(root, 'fr', 'm.po'), os.path.join(root, 'fr', 'n.po')
+        ])
+
+    def test_push_state(self):
+        with open('data/.crowdin.push.ok', 'r') as f:
+            conf = json.loads(f.read())
+        path = os.path.join(tempfile.mkdtemp(), 'state')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+
+        push(conf, include_source=False, state=State(path))
+        push(conf, include_source=False, state=State(path))
+        self.assertEqual(self.server.requests['add-file'], 3)
+        self.assertNotIn('update-file', self.server.requests)
+
+        # files missing remotely are added whatever the state says
+        del self.server.nodes['main/multi/good.po']
+        del self.server.sources['main/multi/good.po']
+        failed = push(conf, include_source=False, state=State(path))
+        self.assertEqual(failed, [])
+        self.assertEqual(self.server.requests['add-file'], 4)
+        self.assertIn('main/multi/good.po', self.server.sources)
+
+    def test_partial_pull_missing_language(self):
+        self.server.populate(['main/simple/file.po', 'main/multi/good.po'],
+                             content=b'msgid ""\n')
+        with open('data/.crowdin.pull.ok', 'r') as f:
+            conf = json.loads(f.read())
+        conf['localizations'][0]['target_langs']['de'] = \
+            '_data/locale/de/simple/file.po'
+
+        # de is not a language of the project
+        results = pull(conf, languages=['fr', 'de'], only='main/simple/*')
+        self.assertEqual([item.target for item, written in results],
+                         ['_data/locale/fr/simple/file.po'])
+
+        results = pull(conf, languages=['de'])
+        self.assertEqual(results, [])
+        self.assertEqual(self.server.requests['download/de.zip'], 1)
+
+    def test_throttled(self):
+        self.server.populate(['main/simple/file.po'])
+        self.server.throttle['update-file'] = 2
+        with open('data/.crowdin.push.ok', 'r') as f:
+            conf = json.loads(f.read())
+        conf['rate_limits'] = {'default': 100}
+
+        failed = push(conf, include_source=False, jobs=2)
+
+        self.assertEqual(failed, [])
+        self.assertEqual(self.server.requests['update-file'], 3)
+        self.assertEqual(self.server.requests['add-file'], 2)
+
+    def test_trust_cache(self):
+        with open('data/.crowdin.push.ok', 'r') as f:
+            conf = json.loads(f.read())
+        path = os.path.join(tempfile.mkdtemp(), 'snapshot')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        snapshot = ProjectSnapshot(path)
+
+        push(conf, include_source=False, snapshot=snapshot, trust_cache=True)
+        self.assertIn('main/multi/good.po', snapshot.load('test-project'))
+        self.assertIsNone(snapshot.load('other-project'))
+
+        failed = push(conf, include_source=False, snapshot=snapshot,
+                      trust_cache=True)
+        self.assertEqual(failed, [])
+        self.assertEqual(self.server.requests['info'], 1)
+        self.assertEqual(self.server.requests['update-file'], 3)
+
+        # the snapshot disagrees with the project
+        del self.server.nodes['main/multi/good.po']
+        del self.server.sources['main/multi/good.po']
+        failed = push(conf, include_source=False, snapshot=snapshot,
+                      trust_cache=True)
+        self.assertEqual(failed, [])
+        self.assertEqual(self.server.requests['info'], 2)
+        self.assertIn('main/multi/good.po', self.server.sources)
+        self.assertIn('main/multi/good.po', snapshot.load('test-project'))
+
+    def test_resume(self):
+        with open('data/.crowdin.push.ok', 'r') as f:
+            conf = json.loads(f.read())
+        path = os.path.join(tempfile.mkdtemp(), 'journal')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write('["push", "data/locale/en/simple/file.po", '
+                    '"main/simple/file.po", null]\n["push", "data/lo')
+
+        failed = push(conf, include_source=False,
+                      journal=Journal(path).open(resume=True))
+
+        self.assertEqual(failed, [])
+        self.assertEqual(self.server.requests['add-file'], 2)
+        self.assertNotIn('main/simple/file.po', self.server.sources)
+        self.assertFalse(os.path.exists(path))
+
+        with open('data/.crowdin.pull.ok', 'r') as f:
+            conf = json.loads(f.read())
+        journal = Journal(path).open()
+        journal.record('export')
+        journal.record('pull', 'fr/main/multi/good.po',
+                       '_data/locale/fr/multi/good.po')
+        journal.close()
+
+        results = pull(conf, journal=Journal(path).open(resume=True))
+
+        self.assertNotIn('export', self.server.requests)
+        self.assertEqual(sorted(item.target for item, written in results),
+                         ['_data/locale/fr/multi/good2.po'])
+        self.assertFalse(os.path.exists(path))
+
+        # completed uploads are recorded in the state on resume
+        with open('data/.crowdin.push.ok', 'r') as f:
+            conf = json.loads(f.read())
+        state = State(os.path.join(os.path.dirname(path), 'state'))
+        item = ('data/locale/en/multi/good.po', 'main/multi/good.po', None)
+        state.prepare(*item)
+        journal = Journal(path).open()
+        journal.record('push', *item, state=state.prepared(*item))
+        journal.close()
+        failed = push(conf, include_source=False, state=state,
+                      journal=Journal(path).open(resume=True))
+        self.assertEqual(failed, [])
+        self.assertEqual(self.server.requests['update-file'], 1)
+        self.assertEqual(self.server.requests['add-file'], 3)
+
+        failed = push(conf, include_source=False, state=state)
+        self.assertEqual(failed, [])
+        self.assertEqual(self.server.requests['update-file'], 1)
+        self.assertEqual(self.server.requests['add-file'], 3)
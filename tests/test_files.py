@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from crowdin.files import DirectoryCache, exclusion_regex, translate
+
+
+class PatternTest(unittest.TestCase):
+
+    def test_translate(self):
+        regex = translate('**/*.po')
+        self.assertTrue(regex.match('file.po'))
+        self.assertTrue(regex.match('a/b/file.po'))
+        self.assertFalse(regex.match('a/file.pot'))
+
+        regex = translate('*/[!_]?.po')
+        self.assertTrue(regex.match('a/ab.po'))
+        self.assertFalse(regex.match('a/_b.po'))
+        self.assertFalse(regex.match('a/b/ab.po'))
+
+    def test_exclusion_regex(self):
+        regex = exclusion_regex("_*, ~*")
+        self.assertTrue(regex.match('_file.po'))
+        self.assertTrue(regex.match('~file.po'))
+        self.assertFalse(regex.match('file.po'))
+        self.assertIsNone(exclusion_regex(""))
+        self.assertIsNone(exclusion_regex(None))
+
+
+class DirectoryCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        for path in ('en/a.po', 'en/b.txt', 'en/sub/c.po', 'en/sub/deep/d.po',
+                     'en/.hidden.po'):
+            path = os.path.join(self.root, *path.split('/'))
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            open(path, 'w').close()
+
+    def test_glob(self):
+        files = DirectoryCache()
+        base = os.path.join(self.root, 'en')
+
+        self.assertEqual(files.glob(os.path.join(base, '*.po')),
+                         [(os.path.join(base, 'a.po'), 'a.po')])
+        self.assertEqual(
+            [path for local, path in files.glob(os.path.join(base, '**',
+                                                             '*.po'))],
+            ['a.po', 'sub/c.po', 'sub/deep/d.po']
+        )
+        self.assertEqual(
+            [path for local, path in files.glob(os.path.join(base, '*',
+                                                             '*.po'))],
+            ['c.po']
+        )
+
+    def test_listed_once(self):
+        files = DirectoryCache()
+        base = os.path.join(self.root, 'en')
+        files.glob(os.path.join(base, '**', '*.po'))
+        listings = dict(files.listings)
+
+        self.assertTrue(files.exists(os.path.join(base, 'sub', 'c.po')))
+        self.assertFalse(files.exists(os.path.join(base, 'sub', 'x.po')))
+        self.assertFalse(files.exists(os.path.join(base, 'none', 'x.po')))
+        self.assertEqual(len(files.listings), len(listings) + 1)
@@ -0,0 +1,26 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from crowdin.journal import Journal
+
+
+class JournalTest(unittest.TestCase):
+
+    def test_resume_partial_line(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        path = os.path.join(root, 'journal')
+        with open(path, 'w') as f:
+            f.write('["a"]\n["b"]\n["pa')
+
+        journal = Journal(path).open(resume=True)
+        journal.record('c')
+        journal.record('d')
+        journal.close()
+
+        journal = Journal(path).open(resume=True)
+        journal.close()
+        self.assertEqual(sorted(journal.completed),
+                         [('a',), ('b',), ('c',), ('d',)])
@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from crowdin.api import ProjectTree
+from crowdin.plan import plan_pull, plan_push
+
+test_path = os.path.dirname(__file__)
+
+
+class PlanTest(unittest.TestCase):
+
+    def setUp(self):
+        os.chdir(test_path)
+
+    def test_plan_push(self):
+        with open('data/.crowdin.push.ok', 'r') as f:
+            conf = json.loads(f.read())
+        info = ProjectTree({'files': [{
+            'name': 'main',
+            'files': [{
+                'name': 'multi',
+                'files': [{'name': 'good.po'}],
+            }],
+        }]})
+
+        plan = plan_push(conf, info, include_source=False)
+
+        self.assertEqual(plan.mkdirs, ['main/simple'])
+        self.assertEqual(sorted(item.remote for item in plan.adds),
+                         ['main/multi/good2.po', 'main/simple/file.po'])
+        self.assertEqual([item.remote for item in plan.updates],
+                         ['main/multi/good.po'])
+        self.assertEqual(plan.translations, [])
+        # planning doesn't change the snapshot
+        self.assertNotIn('main/simple', info)
+        self.assertIn('1 directories, 2 added, 1 updated', plan.describe())
+
+    def test_plan_push_recursive(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        for path in ('en/a.po', 'en/sub/b.po', 'en/sub/_c.po', 'fr/sub/b.po'):
+            path = os.path.join(root, *path.split('/'))
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            open(path, 'w').close()
+        conf = {'localizations': [{
+            'source_path': os.path.join(root, 'en', '**', '*.po'),
+            'excluded': '_*',
+            'remote_path': 'docs/',
+            'target_langs': {'fr': os.path.join(root, 'fr', '')},
+        }]}
+
+        plan = plan_push(conf, ProjectTree({'files': []}),
+                         include_source=True)
+
+        self.assertEqual(plan.mkdirs, ['docs', 'docs/sub'])
+        self.assertEqual([item.remote for item in plan.adds],
+                         ['docs/a.po', 'docs/sub/b.po'])
+        self.assertEqual(plan.translations, [(
+            os.path.join(root, 'fr', 'sub', 'b.po'), 'docs/sub/b.po', 'fr'
+        )])
+
+    def test_plan_pull(self):
+        with open('data/.crowdin.pull.ok', 'r') as f:
+            conf = json.loads(f.read())
+        info = ProjectTree({'files': [{
+            'name': 'main',
+            'files': [{
+                'name': 'multi',
+                'files': [{'name': 'good.po'}, {'name': 'good2.po'}],
+            }],
+        }]})
+
+        plan = plan_pull(conf, info)
+
+        # main/simple/file.po doesn't exist remotely
+        self.assertEqual(len(plan.downloads), 6)
+        self.assertIn(('fr', 'main/multi/good2.po',
+                       '_data/locale/fr/multi/good2.po'), plan.downloads)
+
+    def test_plan_pull_recursive(self):
+        conf = {'localizations': [{
+            'source_path': 'en/**/*.po',
+            'remote_path': 'main/',
+            'target_langs': {'fr': 'fr/'},
+        }]}
+        info = ProjectTree({'files': [{
+            'name': 'main',
+            'files': [{'name': 'x.po'}, {
+                'name': 'sub',
+                'files': [{'name': 'y.po'}],
+            }],
+        }]})
+
+        plan = plan_pull(conf, info)
+
+        self.assertEqual(plan.downloads, [
+            ('fr', 'main/sub/y.po', 'fr/sub/y.po'),
+            ('fr', 'main/x.po', 'fr/x.po'),
+        ])
@@ -0,0 +1,87 @@
+import json
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+
+from crowdin.api import API
+from crowdin.projects import (find_configs, load_config, report,
+                              run_projects, shared_limiter)
+
+from tests.server import FakeCrowdin
+
+
+class ProjectsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.root = tempfile.mkdtemp()
+        os.chdir(self.root)
+        self.addCleanup(shutil.rmtree, self.root)
+        self.addCleanup(os.chdir, self.cwd)
+        for name in ('a', 'b'):
+            os.makedirs(os.path.join('services', name, 'locale/en'))
+            with open('services/{0}/locale/en/django.po'.format(name),
+                      'wb') as f:
+                f.write(b'msgid ""\n')
+            with open('services/{0}/.crowdin'.format(name), 'w') as f:
+                f.write(json.dumps({
+                    'project_name': 'test-project',
+                    'api_key': 'key',
+                    'localizations': [{
+                        'source_path': 'locale/en/*.po',
+                        'remote_path': '{0}/'.format(name),
+                        'target_langs': {'fr': 'locale/fr/'},
+                    }],
+                }))
+
+    def test_load_config(self):
+        self.assertEqual(find_configs('services/*/.crowdin'), [
+            'services/a/.crowdin', 'services/b/.crowdin'
+        ])
+        conf = load_config('services/a/.crowdin')
+        localization = conf['localizations'][0]
+        self.assertEqual(localization['source_path'],
+                         os.path.join('services/a', 'locale/en/*.po'))
+        self.assertEqual(localization['target_langs'],
+                         {'fr': os.path.join('services/a', 'locale/fr/')})
+
+    def test_run_projects(self):
+        server = FakeCrowdin().start()
+        self.addCleanup(server.stop)
+        patcher = mock.patch.object(API, 'root_url', server.root_url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        results = run_projects('push', find_configs('services/*/.crowdin'),
+                               jobs=2, include_source=False)
+
+        self.assertEqual(sorted(server.sources),
+                         ['a/django.po', 'b/django.po'])
+        self.assertEqual([(result.failed, result.error) for result in results],
+                         [([], None), ([], None)])
+        self.assertTrue(os.path.exists('services/a/.crowdin.state'))
+        self.assertIn('2 projects, 0 with errors', report(results))
+
+        os.remove('services/b/.crowdin')
+        os.mkdir('services/b/.crowdin')
+        results = run_projects('pull', ['services/b/.crowdin'])
+        self.assertIsNotNone(results[0].error)
+        self.assertIn('1 with errors', report(results))
+
+    def test_shared_limiter(self):
+        with open('services/b/.crowdin', 'r') as f:
+            conf = json.loads(f.read())
+        conf['rate_limits'] = {'default': 2, 'add-file': 1}
+        with open('services/b/.crowdin', 'w') as f:
+            f.write(json.dumps(conf))
+        configs = find_configs('services/*/.crowdin')
+        self.assertEqual(shared_limiter(configs).rates,
+                         {'default': 2, 'add-file': 1})
+
+        with mock.patch('crowdin.projects.push', return_value=[]) as push:
+            run_projects('push', configs, jobs=2)
+        limiters = [call[1]['limiter'] for call in push.call_args_list]
+        self.assertEqual(len(limiters), 2)
+        self.assertIs(limiters[0], limiters[1])
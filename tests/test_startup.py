@@ -0,0 +1,57 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+test_path = os.path.dirname(__file__)
+
+HEAVY = ['multiprocessing.pool', 'optparse', 'requests', 'tempfile',
+         'xml.etree.ElementTree', 'zipfile']
+
+SCRIPT = """
+import sys
+before = set(sys.modules)
+from crowdin.main import main
+main({0!r})
+sys.stderr.write(' '.join(sorted(set(sys.modules) - before)))
+"""
+
+
+class StartupTest(unittest.TestCase):
+    """
+    Guards the lazy imports of the command line entry point.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        with open(os.path.join(self.root, '.crowdin'), 'w') as f:
+            f.write(json.dumps({'project_name': 'test-project',
+                                'api_key': 'key', 'localizations': []}))
+
+    def imported(self, argv):
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(
+            os.path.abspath(test_path)
+        ))
+        process = subprocess.Popen(
+            [sys.executable, '-c', SCRIPT.format(argv)], cwd=self.root,
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        stdout, stderr = process.communicate()
+        self.assertEqual(process.returncode, 0, stderr)
+        # the imported modules are written last
+        return set(stderr.decode('utf-8').splitlines()[-1].split())
+
+    def test_version(self):
+        imported = self.imported(['--version'])
+        self.assertEqual([name for name in HEAVY if name in imported], [])
+        self.assertNotIn('logging', imported)
+
+    def test_dry_run(self):
+        for action in ('push', 'pull'):
+            imported = self.imported(['--dry-run', action])
+            self.assertEqual([name for name in HEAVY if name in imported],
+                             ['optparse'])
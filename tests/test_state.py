@@ -0,0 +1,35 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from crowdin.state import State
+
+
+class StateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.path = os.path.join(self.root, 'file.po')
+        with open(self.path, 'wb') as f:
+            f.write(b'msgid ""\n')
+
+    def test_changed_during_upload(self):
+        state = State(os.path.join(self.root, 'state'))
+        state.prepare(self.path, 'file.po')
+        with open(self.path, 'ab') as f:
+            f.write(b'msgstr ""\n')
+        state.record(self.path, 'file.po')
+        self.assertFalse(state.is_unchanged(self.path, 'file.po'))
+
+        state.prepare(self.path, 'file.po')
+        state.record(self.path, 'file.po')
+        self.assertTrue(state.is_unchanged(self.path, 'file.po'))
+
+    def test_deleted(self):
+        state = State(os.path.join(self.root, 'state'))
+        state.prepare(self.path, 'file.po')
+        state.record(self.path, 'file.po')
+        os.remove(self.path)
+        self.assertFalse(state.is_unchanged(self.path, 'file.po'))
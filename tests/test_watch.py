@@ -0,0 +1,132 @@
+import mock
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from crowdin.api import API
+from crowdin.state import State
+from crowdin.watch import PollingWatcher, watch, watched_directories
+
+from tests.server import FakeCrowdin
+
+
+class WatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.root = tempfile.mkdtemp()
+        os.chdir(self.root)
+        self.addCleanup(shutil.rmtree, self.root)
+        self.addCleanup(os.chdir, self.cwd)
+        for path in ('en/a.po', 'en/sub/b.po', 'fr/a.po'):
+            self.write(path, b'msgid ""\n')
+        self.conf = {
+            'project_name': 'test-project',
+            'api_key': 'key',
+            'localizations': [{
+                'source_path': 'en/**/*.po',
+                'remote_path': 'main/',
+                'target_langs': {'fr': 'fr/'},
+            }],
+        }
+
+    def write(self, path, content):
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(content)
+
+    def wait(self, condition, timeout=5):
+        start = time.time()
+        while not condition():
+            self.assertLess(time.time() - start, timeout)
+            time.sleep(0.02)
+
+    def test_watched_directories(self):
+        self.assertEqual(watched_directories(self.conf, False), set([
+            os.path.join(self.root, 'en'), os.path.join(self.root, 'en/sub')
+        ]))
+        self.assertIn(os.path.join(self.root, 'fr'),
+                      watched_directories(self.conf, True))
+
+    def test_polling(self):
+        watcher = PollingWatcher(interval=0)
+        watcher.watch([os.path.join(self.root, 'en')])
+        self.assertEqual(watcher.read(0), set())
+
+        time.sleep(0.01)
+        self.write('en/a.po', b'msgid "changed"\n')
+        os.mkdir('en/new')
+        self.assertEqual(watcher.read(0), set([
+            os.path.join(self.root, 'en/a.po'),
+            os.path.join(self.root, 'en/new'),
+        ]))
+
+    def test_watch(self):
+        server = FakeCrowdin().start()
+        self.addCleanup(server.stop)
+        patcher = mock.patch.object(API, 'root_url', server.root_url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        stop = threading.Event()
+        kwargs = {
+            'state': State(os.path.join(self.root, 'state')),
+            'debounce': 0.05, 'max_delay': 0.2,
+            'watcher': PollingWatcher(interval=0.05), 'stop': stop,
+        }
+        thread = threading.Thread(target=watch, args=(self.conf, False),
+                                  kwargs=kwargs)
+        thread.start()
+        try:
+            self.wait(lambda: 'main/sub/b.po' in server.sources)
+            self.assertEqual(server.requests['info'], 1)
+
+            self.write('en/a.po', b'msgid "changed"\n')
+            self.write('en/new/c.po', b'msgid "new"\n')
+            self.wait(lambda: 'main/new/c.po' in server.sources)
+            self.wait(lambda: server.sources['main/a.po'] != b'msgid ""\n')
+        finally:
+            stop.set()
+            thread.join()
+
+        self.assertEqual(server.requests['info'], 1)
+        self.assertEqual(server.requests['add-file'], 3)
+        # unchanged b.po was not uploaded again
+        self.assertEqual(server.requests['update-file'], 1)
+
+    def test_watch_stale(self):
+        server = FakeCrowdin().start()
+        self.addCleanup(server.stop)
+        patcher = mock.patch.object(API, 'root_url', server.root_url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        stop = threading.Event()
+        kwargs = {
+            'debounce': 0.05, 'max_delay': 0.2,
+            'watcher': PollingWatcher(interval=0.05), 'stop': stop,
+        }
+        thread = threading.Thread(target=watch, args=(self.conf, False),
+                                  kwargs=kwargs)
+        thread.start()
+        try:
+            self.wait(lambda: 'main/sub/b.po' in server.sources)
+            # deleted on the server, the next update fails
+            del server.nodes['main/a.po']
+            del server.sources['main/a.po']
+            self.write('en/a.po', b'msgid "changed"\n')
+            self.wait(lambda: server.requests.get('info') == 2)
+
+            time.sleep(0.05)
+            self.write('en/a.po', b'msgid "changed again"\n')
+            self.wait(lambda: 'main/a.po' in server.sources)
+        finally:
+            stop.set()
+            thread.join()
+
+        self.assertEqual(server.requests['update-file'], 1)
+        self.assertEqual(server.requests['add-file'], 3)